@@ -1,13 +1,17 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Header
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Request
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from starlette.datastructures import State
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any, Callable, Awaitable
+from typing import List, Optional, Dict, Any, Callable, Awaitable, Mapping, Tuple
 import uuid
+from functools import partial
 from datetime import datetime, timezone
 import httpx
 import asyncio
@@ -18,14 +22,6 @@ import hmac
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Create the main app without a prefix
-app = FastAPI()
-
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -34,6 +30,9 @@ ETH_CHAIN_ID = 1
 POLYGON_AMOY_CHAIN_ID = 80_002
 
 # Service helpers
+from services.admission import AdmissionController, AdmissionRejected, RouteLimiter
+from services.cache_warmer import AccessTracker, CacheWarmer
+from services.chains import ChainConfig, load_chain_registry
 from services.emergent_agent import (
     DEFAULT_AGENT_URL as EMERGENT_DEFAULT_AGENT_URL,
     EmergentAgentError,
@@ -42,25 +41,68 @@ from services.emergent_agent import (
     health_check as emergent_health_check,
 )
 from services.etherscan_v2 import (
+    CALLS_PER_SECOND as ETHERSCAN_CALLS_PER_SECOND,
     EtherscanError,
     get_account_balance as get_v2_balance,
     get_account_transactions as get_v2_transactions,
+    get_token_balance as get_v2_token_balance,
+    get_token_transfers as get_v2_token_transfers,
 )
 from services.pricing import (
+    PricingError,
     estimate_usd_from_token_wei,
     estimate_usd_from_wei,
     get_eth_price_usd,
     get_matic_price_usd,
+    get_prices_usd,
+    get_token_prices_usd,
+)
+from services.price_history import PriceHistoryError, PriceHistoryStore, epoch_seconds
+from services import upstream
+from services.phoenix_events import (
+    BACKFILL_FILTER as PHOENIX_BACKFILL_FILTER,
+    BACKFILL_MIGRATION_ID as PHOENIX_BACKFILL_MIGRATION_ID,
+    INDEXES as PHOENIX_WEBHOOK_INDEXES,
+    backfill_update as phoenix_backfill_update,
+    case_detail_pipeline,
+    case_summaries_pipeline,
+    extract_event_fields,
 )
 
 # Environment variables (after service imports to leverage defaults)
 EMERGENT_AGENT_URL = os.environ.get('EMERGENT_AGENT_URL', EMERGENT_DEFAULT_AGENT_URL)
 PHOENIX_WEBHOOK_SECRET = os.environ.get('PHOENIX_WEBHOOK_SECRET', 'change-me-in-production')
 
-# In-memory cache with TTL
-cache_store = {}
+# Chains served by the portfolio endpoint (CHAIN_REGISTRY_PATH overrides)
+CHAIN_REGISTRY = load_chain_registry()
+
+# In-memory cache TTL; each app keeps its entries in ``app.state.cache_store``
 CACHE_TTL = 30  # 30 seconds
 
+# Admission control for upstream-bound route classes
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '0.5'))
+ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', '2'))
+
+
+def _route_limiter(name: str, default_concurrency: int) -> RouteLimiter:
+    concurrency = int(os.environ.get(f'ADMISSION_{name.upper()}_CONCURRENCY', default_concurrency))
+    return RouteLimiter(
+        name,
+        concurrency=concurrency,
+        max_queue=int(os.environ.get(f'ADMISSION_{name.upper()}_QUEUE', concurrency * 2)),
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+        retry_after=ADMISSION_RETRY_AFTER,
+    )
+
+
+def build_admission_controller() -> AdmissionController:
+    return AdmissionController({
+        '/api/eth/': _route_limiter('eth', 16),
+        '/api/polygon/': _route_limiter('polygon', 16),
+        '/api/emergent/': _route_limiter('emergent', 8),
+        '/api/portfolio/': _route_limiter('portfolio', 4),
+    })
+
 
 # Define Models
 class StatusCheck(BaseModel):
@@ -90,6 +132,42 @@ class EthTransaction(BaseModel):
     timestamp: datetime
     block_number: str
     gas_used: str
+    usd_at_time: Optional[float] = None
+
+
+class TokenHolding(BaseModel):
+    contract_address: str
+    symbol: Optional[str] = None
+    name: Optional[str] = None
+    decimals: int
+    balance_raw: str
+    balance: float
+    price_usd: Optional[float] = None
+    value_usd: Optional[float] = None
+
+
+class ChainHoldings(BaseModel):
+    chain_id: int
+    name: str
+    symbol: str
+    is_testnet: bool = False
+    native_balance_wei: str
+    native_balance: float
+    native_price_usd: Optional[float] = None
+    native_value_usd: Optional[float] = None
+    tokens: List[TokenHolding] = Field(default_factory=list)
+    # More than PORTFOLIO_MAX_TOKENS contracts were found; only the most recent are listed
+    tokens_truncated: bool = False
+    total_usd: float = 0.0
+    status: str
+    error: Optional[str] = None
+
+
+class PortfolioSnapshot(BaseModel):
+    address: str
+    chains: List[ChainHoldings]
+    total_usd: float
+    last_updated: datetime
 
 
 class EmergentAgentBalance(BaseModel):
@@ -118,6 +196,45 @@ class PhoenixWebhookPayload(BaseModel):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class PhoenixEventTypeCount(BaseModel):
+    event_type: Optional[str] = None
+    count: int
+
+
+class PhoenixLatestEvent(BaseModel):
+    event_type: Optional[str] = None
+    evidence_id: Optional[str] = None
+    event_at: datetime
+    received_at: datetime
+
+
+class PhoenixCaseSummary(BaseModel):
+    case_id: str
+    total_events: int
+    evidence_count: int
+    first_event_at: datetime
+    last_event_at: datetime
+    latest_event: PhoenixLatestEvent
+    by_type: List[PhoenixEventTypeCount]
+
+
+class PhoenixTimelineBucket(BaseModel):
+    bucket_start: datetime
+    count: int
+    by_type: List[PhoenixEventTypeCount]
+
+
+class PhoenixRecentEvent(PhoenixLatestEvent):
+    payload: Dict[str, Any]
+
+
+class PhoenixCaseDetail(BaseModel):
+    summary: PhoenixCaseSummary
+    bucket: str
+    timeline: List[PhoenixTimelineBucket]
+    recent_events: List[PhoenixRecentEvent]
+
+
 # Cache helper
 def get_cache_key(key: str) -> str:
     return f"cache:{key}"
@@ -126,33 +243,73 @@ def is_cache_valid(cache_entry: dict) -> bool:
     if not cache_entry:
         return False
     age = (datetime.now(timezone.utc) - cache_entry['cached_at']).total_seconds()
-    return age < CACHE_TTL
+    return age < cache_entry.get('ttl', CACHE_TTL)
+
+
+# Chain segment of /api/<chain>/<kind>/<address> routes served from cache_store
+CACHED_ROUTE_CHAINS = {'eth': ETH_CHAIN_ID, 'polygon': POLYGON_AMOY_CHAIN_ID}
+CACHED_ROUTE_KINDS = {'balance': 'balance', 'txs': 'txs'}
+
+
+def is_cache_hit_request(state: State, path: str, query_params: Mapping[str, str]) -> bool:
+    """Whether the request can be answered from in-memory state alone."""
+    parts = path.strip('/').split('/')
+    if len(parts) == 3 and parts[:2] == ['api', 'portfolio']:
+        return is_cache_valid(state.cache_store.get(get_cache_key(f"portfolio:{parts[2]}")))
+    if len(parts) != 4 or parts[0] != 'api':
+        return False
+    chain_id = CACHED_ROUTE_CHAINS.get(parts[1])
+    kind = CACHED_ROUTE_KINDS.get(parts[2])
+    if chain_id is None or kind is None:
+        return False
+    cache_entry = state.cache_store.get(get_cache_key(f"{kind}:{chain_id}:{parts[3]}"))
+    if not is_cache_valid(cache_entry):
+        return False
+    if kind == 'txs' and query_params.get('usd_at_time', '').lower() in ('1', 'true', 'yes', 'on'):
+        return not usd_at_time_needs_download(state, cache_entry['data'], chain_id=chain_id)
+    return True
 
 
 # Etherscan API functions
+def _balance_from_doc(doc: Dict[str, Any], symbol: str) -> dict:
+    return {
+        'balance_wei': doc['balance_wei'],
+        'balance_native': doc['balance_native'],
+        'balance_usd': doc.get('balance_usd'),
+        'symbol': doc.get('symbol', symbol),
+    }
+
+
 async def fetch_etherscan_balance(
+    state: State,
     address: str,
     *,
     chain_id: int,
     symbol: str,
     price_getter: Optional[Callable[[], Awaitable[Optional[float]]]] = None,
+    refresh: bool = False,
 ) -> dict:
-    """Fetch and cache the balance for a given address/chain pair."""
+    """Fetch and cache the balance for a given address/chain pair.
+
+    ``refresh`` bypasses both cache layers; it is used by the cache warmer and
+    does not count as an access.
+    """
 
     cache_key = get_cache_key(f"balance:{chain_id}:{address}")
 
-    if cache_key in cache_store and is_cache_valid(cache_store[cache_key]):
-        return cache_store[cache_key]['data']
+    cache_store = state.cache_store
+
+    if not refresh:
+        state.access_tracker.record('balance', chain_id, address)
+        if cache_key in cache_store and is_cache_valid(cache_store[cache_key]):
+            return cache_store[cache_key]['data']
 
     cache_type = f"balance:{chain_id}"
-    cached = await db.eth_cache.find_one({'type': cache_type, 'address': address})
+    cached = None
+    if not refresh:
+        cached = await state.db.eth_cache.find_one({'type': cache_type, 'address': address})
     if cached and is_cache_valid({'cached_at': cached['cached_at']}):
-        data = {
-            'balance_wei': cached['balance_wei'],
-            'balance_native': cached['balance_native'],
-            'balance_usd': cached.get('balance_usd'),
-            'symbol': cached.get('symbol', symbol),
-        }
+        data = _balance_from_doc(cached, symbol)
         cache_store[cache_key] = {'data': data, 'cached_at': cached['cached_at']}
         return data
 
@@ -176,7 +333,7 @@ async def fetch_etherscan_balance(
     now = datetime.now(timezone.utc)
     cache_store[cache_key] = {'data': data, 'cached_at': now}
 
-    await db.eth_cache.update_one(
+    await state.db.eth_cache.update_one(
         {'type': cache_type, 'address': address},
         {'$set': {
             'balance_wei': balance_wei,
@@ -193,20 +350,30 @@ async def fetch_etherscan_balance(
 
 
 async def fetch_etherscan_transactions(
+    state: State,
     address: str,
     *,
     chain_id: int,
     limit: int = 3,
+    refresh: bool = False,
 ) -> List[Dict[str, Any]]:
-    """Fetch and cache the latest transactions for an address/chain pair."""
+    """Fetch and cache the latest transactions for an address/chain pair.
+
+    ``refresh`` bypasses both cache layers, as in ``fetch_etherscan_balance``.
+    """
 
     cache_key = get_cache_key(f"txs:{chain_id}:{address}")
+    cache_store = state.cache_store
 
-    if cache_key in cache_store and is_cache_valid(cache_store[cache_key]):
-        return cache_store[cache_key]['data']
+    if not refresh:
+        state.access_tracker.record('txs', chain_id, address)
+        if cache_key in cache_store and is_cache_valid(cache_store[cache_key]):
+            return cache_store[cache_key]['data']
 
     cache_type = f"transactions:{chain_id}"
-    cached = await db.eth_cache.find_one({'type': cache_type, 'address': address})
+    cached = None
+    if not refresh:
+        cached = await state.db.eth_cache.find_one({'type': cache_type, 'address': address})
     if cached and is_cache_valid({'cached_at': cached['cached_at']}):
         data = cached['transactions'][:limit]
         cache_store[cache_key] = {'data': data, 'cached_at': cached['cached_at']}
@@ -239,7 +406,7 @@ async def fetch_etherscan_transactions(
     now = datetime.now(timezone.utc)
     cache_store[cache_key] = {'data': transactions, 'cached_at': now}
 
-    await db.eth_cache.update_one(
+    await state.db.eth_cache.update_one(
         {'type': cache_type, 'address': address},
         {'$set': {
             'transactions': transactions,
@@ -252,25 +419,381 @@ async def fetch_etherscan_transactions(
     return transactions[:limit]
 
 
+# Multi-chain portfolio
+PORTFOLIO_MAX_TOKENS = int(os.environ.get('PORTFOLIO_MAX_TOKENS', '20'))
+PORTFOLIO_CONCURRENCY = int(os.environ.get('PORTFOLIO_CONCURRENCY', '4'))
+# Snapshots with failed lookups are only kept briefly and never persisted
+PORTFOLIO_DEGRADED_TTL = float(os.environ.get('PORTFOLIO_DEGRADED_TTL', '5'))
+
+
+def _to_units(raw: Any, decimals: int) -> float:
+    try:
+        return int(raw) / 10 ** decimals
+    except (TypeError, ValueError):
+        return 0.0
+
+
+async def fetch_chain_holdings(
+    address: str,
+    chain: ChainConfig,
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, Any]:
+    """Fetch native and non-zero ERC-20 balances of an address on one chain."""
+
+    async def limited(call: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await call
+
+    holdings: Dict[str, Any] = {
+        'chain_id': chain.chain_id,
+        'name': chain.name,
+        'symbol': chain.symbol,
+        'is_testnet': chain.is_testnet,
+        'native_balance_wei': '0',
+        'native_balance': 0.0,
+        'tokens': [],
+        'tokens_truncated': False,
+        'status': 'success',
+    }
+
+    try:
+        native_wei, transfers = await asyncio.gather(
+            limited(get_v2_balance(address, chain_id=chain.chain_id)),
+            limited(get_v2_token_transfers(address, chain_id=chain.chain_id)),
+        )
+    except (httpx.HTTPError, EtherscanError) as e:
+        holdings.update(status='error', error=str(e))
+        return holdings
+
+    holdings['native_balance_wei'] = native_wei
+    holdings['native_balance'] = _to_units(native_wei, chain.decimals)
+
+    # Transfers are newest first, so the cap keeps the most recently used tokens.
+    tokens: Dict[str, Dict[str, Any]] = {}
+    for transfer in transfers:
+        contract = (transfer.get('contractAddress') or '').lower()
+        if not contract or contract in tokens:
+            continue
+        if len(tokens) >= PORTFOLIO_MAX_TOKENS:
+            holdings['tokens_truncated'] = True
+            break
+        try:
+            decimals = int(transfer.get('tokenDecimal') or 0)
+        except (TypeError, ValueError):
+            decimals = 0
+        tokens[contract] = {
+            'contract_address': contract,
+            'symbol': transfer.get('tokenSymbol'),
+            'name': transfer.get('tokenName'),
+            'decimals': decimals,
+        }
+
+    balances = await asyncio.gather(
+        *(
+            limited(get_v2_token_balance(address, contract, chain_id=chain.chain_id))
+            for contract in tokens
+        ),
+        return_exceptions=True,
+    )
+
+    failed = 0
+    for token, balance_raw in zip(tokens.values(), balances):
+        if isinstance(balance_raw, Exception):
+            if not isinstance(balance_raw, (httpx.HTTPError, EtherscanError)):
+                raise balance_raw
+            failed += 1
+            continue
+        balance = _to_units(balance_raw, token['decimals'])
+        if balance > 0:
+            holdings['tokens'].append({**token, 'balance_raw': balance_raw, 'balance': balance})
+
+    if failed:
+        holdings.update(status='partial', error=f"{failed} token balance lookups failed")
+    elif holdings['tokens_truncated']:
+        holdings.update(
+            status='partial',
+            error=f"Only the {PORTFOLIO_MAX_TOKENS} most recently used tokens were checked",
+        )
+    return holdings
+
+
+async def fetch_portfolio_prices(
+    chains: List[Dict[str, Any]],
+) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]], bool]:
+    """Price all native assets in one request and all tokens in one request per platform.
+
+    Testnet assets are not priced. The last element is ``False`` when a
+    lookup failed and the prices are therefore incomplete.
+    """
+
+    native_ids = set()
+    contracts_by_platform: Dict[str, set] = {}
+    for chain in chains:
+        config = CHAIN_REGISTRY[chain['chain_id']]
+        if config.is_testnet:
+            continue
+        if config.coingecko_id:
+            native_ids.add(config.coingecko_id)
+        if config.coingecko_platform and chain['tokens']:
+            contracts_by_platform.setdefault(config.coingecko_platform, set()).update(
+                token['contract_address'] for token in chain['tokens']
+            )
+
+    platforms = list(contracts_by_platform)
+    results = await asyncio.gather(
+        get_prices_usd(native_ids),
+        *(get_token_prices_usd(platform, contracts_by_platform[platform]) for platform in platforms),
+        return_exceptions=True,
+    )
+
+    complete = True
+    prices: List[Dict[str, float]] = []
+    for result in results:
+        if isinstance(result, (httpx.HTTPError, PricingError)):
+            logger.warning("Portfolio price lookup failed: %s", result)
+            complete = False
+            result = {}
+        elif isinstance(result, BaseException):
+            raise result
+        prices.append(result)
+    return prices[0], dict(zip(platforms, prices[1:])), complete
+
+
+async def build_portfolio(state: State, address: str) -> Dict[str, Any]:
+    """Return the cached holdings of an address, building them at most once at a time.
+
+    Concurrent requests for an uncached address share one in-flight build,
+    since each build fans out to dozens of rate-limited Etherscan calls.
+    """
+
+    cache_key = get_cache_key(f"portfolio:{address}")
+    cache_entry = state.cache_store.get(cache_key)
+    if is_cache_valid(cache_entry):
+        return cache_entry['data']
+
+    builds = state.portfolio_builds
+    task = builds.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(fetch_portfolio(state, address))
+        builds[cache_key] = task
+        task.add_done_callback(lambda _: builds.pop(cache_key, None))
+    # Shielded so a disconnecting client does not cancel the build for the others
+    return await asyncio.shield(task)
+
+
+async def fetch_portfolio(state: State, address: str) -> Dict[str, Any]:
+    """Fetch and cache the holdings of an address across all configured chains."""
+
+    cache_key = get_cache_key(f"portfolio:{address}")
+    cache_store = state.cache_store
+
+    cached = await state.db.eth_cache.find_one({'type': 'portfolio', 'address': address})
+    if cached and is_cache_valid({'cached_at': cached['cached_at']}):
+        data = cached['snapshot']
+        cache_store[cache_key] = {'data': data, 'cached_at': cached['cached_at']}
+        return data
+
+    semaphore = asyncio.Semaphore(PORTFOLIO_CONCURRENCY)
+    chains = await asyncio.gather(
+        *(fetch_chain_holdings(address, chain, semaphore) for chain in CHAIN_REGISTRY.values())
+    )
+    native_prices, token_prices, prices_complete = await fetch_portfolio_prices(chains)
+
+    total_usd = 0.0
+    for chain in chains:
+        config = CHAIN_REGISTRY[chain['chain_id']]
+        chain_total = 0.0
+
+        if not config.is_testnet:
+            native_price = native_prices.get(config.coingecko_id or '')
+            chain['native_price_usd'] = native_price
+            if native_price is not None:
+                chain['native_value_usd'] = chain['native_balance'] * native_price
+                chain_total += chain['native_value_usd']
+
+            platform_prices = token_prices.get(config.coingecko_platform or '', {})
+            for token in chain['tokens']:
+                price = platform_prices.get(token['contract_address'])
+                token['price_usd'] = price
+                if price is not None:
+                    token['value_usd'] = token['balance'] * price
+                    chain_total += token['value_usd']
+
+        chain['total_usd'] = chain_total
+        total_usd += chain_total
+
+    now = datetime.now(timezone.utc)
+    data = {
+        'address': address,
+        'chains': chains,
+        'total_usd': total_usd,
+        'last_updated': now,
+    }
+
+    degraded = not prices_complete or any(chain['status'] != 'success' for chain in chains)
+    if degraded:
+        cache_store[cache_key] = {'data': data, 'cached_at': now, 'ttl': PORTFOLIO_DEGRADED_TTL}
+        return data
+
+    cache_store[cache_key] = {'data': data, 'cached_at': now}
+
+    await state.db.eth_cache.update_one(
+        {'type': 'portfolio', 'address': address},
+        {'$set': {
+            'snapshot': data,
+            'cached_at': now,
+            'updated_at': now,
+        }},
+        upsert=True
+    )
+
+    return data
+
+
+# Historical USD valuation of transactions
+# CoinGecko asset id of each chain's native token
+PRICE_HISTORY_ASSETS = {
+    chain.chain_id: chain.coingecko_id
+    for chain in CHAIN_REGISTRY.values()
+    if chain.coingecko_id and not chain.is_testnet
+}
+
+
+def usd_at_time_needs_download(
+    state: State,
+    transactions: List[Dict[str, Any]],
+    *,
+    chain_id: int,
+) -> bool:
+    """Whether valuing ``transactions`` would download historical prices."""
+
+    coin_id = PRICE_HISTORY_ASSETS.get(chain_id)
+    if coin_id is None or not transactions:
+        return False
+    epochs = [epoch_seconds(tx['timestamp']) for tx in transactions]
+    return state.price_history.needs_download(coin_id, min(epochs), max(epochs))
+
+
+async def attach_usd_at_time(
+    state: State,
+    transactions: List[Dict[str, Any]],
+    *,
+    chain_id: int,
+) -> List[Dict[str, Any]]:
+    """Return copies of ``transactions`` valued in USD at their own timestamps."""
+
+    valued = [dict(tx, usd_at_time=None) for tx in transactions]
+    coin_id = PRICE_HISTORY_ASSETS.get(chain_id)
+    if coin_id is None:
+        logger.info("usd_at_time left empty: chain %s has no priced asset in the registry", chain_id)
+        return valued
+    if not valued:
+        return valued
+
+    try:
+        usd_values = await state.price_history.usd_values(
+            coin_id,
+            [tx['timestamp'] for tx in valued],
+            [tx['value_eth'] for tx in valued],
+        )
+    except (httpx.HTTPError, PriceHistoryError) as e:
+        logger.warning("Historical prices unavailable for %s: %s", coin_id, e)
+        return valued
+
+    for tx, usd in zip(valued, usd_values):
+        tx['usd_at_time'] = usd
+    return valued
+
+
+# Cache warmer for frequently requested addresses
+CACHE_WARMER_ENABLED = os.environ.get('CACHE_WARMER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# Native symbol and spot price getter used when re-fetching balances per chain
+WARMED_BALANCE_CHAINS = {
+    ETH_CHAIN_ID: ('ETH', get_eth_price_usd),
+    POLYGON_AMOY_CHAIN_ID: ('MATIC', get_matic_price_usd),
+}
+DEFAULT_WARMED_TX_LIMIT = 3
+# Each uvicorn worker runs its own warmer, so the quota share is split between them.
+CACHE_WARMER_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', '1')))
+
+def build_access_tracker() -> AccessTracker:
+    return AccessTracker(half_life=float(os.environ.get('CACHE_WARMER_HALF_LIFE', '300')))
+
+
+def cache_expires_in(state: State, kind: str, chain_id: int, address: str) -> float:
+    """Seconds until the in-memory entry for the key expires (0 when missing)."""
+    cache_entry = state.cache_store.get(get_cache_key(f"{kind}:{chain_id}:{address}"))
+    if not cache_entry:
+        return 0.0
+    age = (datetime.now(timezone.utc) - cache_entry['cached_at']).total_seconds()
+    return CACHE_TTL - age
+
+
+async def refresh_cache_entry(state: State, kind: str, chain_id: int, address: str) -> None:
+    if kind == 'balance':
+        symbol, price_getter = WARMED_BALANCE_CHAINS[chain_id]
+        await fetch_etherscan_balance(
+            state,
+            address,
+            chain_id=chain_id,
+            symbol=symbol,
+            price_getter=price_getter,
+            refresh=True,
+        )
+    elif kind == 'txs':
+        cache_entry = state.cache_store.get(get_cache_key(f"txs:{chain_id}:{address}"))
+        limit = len(cache_entry['data']) if cache_entry else 0
+        await fetch_etherscan_transactions(
+            state,
+            address,
+            chain_id=chain_id,
+            limit=limit or DEFAULT_WARMED_TX_LIMIT,
+            refresh=True,
+        )
+
+
+def build_cache_warmer(state: State) -> CacheWarmer:
+    return CacheWarmer(
+        state.access_tracker,
+        refresh=partial(refresh_cache_entry, state),
+        expires_in=partial(cache_expires_in, state),
+        top_k=int(os.environ.get('CACHE_WARMER_TOP_K', '20')),
+        interval=float(os.environ.get('CACHE_WARMER_INTERVAL', '2')),
+        lead_time=float(os.environ.get('CACHE_WARMER_LEAD_TIME', '5')),
+        min_score=float(os.environ.get('CACHE_WARMER_MIN_SCORE', '2')),
+        calls_per_second=ETHERSCAN_CALLS_PER_SECOND,
+        quota_share=float(os.environ.get('CACHE_WARMER_QUOTA_SHARE', '0.2')) / CACHE_WARMER_WORKERS,
+    )
+
+
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "Ethereum Dashboard API v1.0"}
 
+
+@api_router.get("/ready")
+async def readiness(request: Request):
+    """Report whether startup warmup has finished and the worker can take traffic."""
+    if not request.app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
 @api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
+async def create_status_check(input: StatusCheckCreate, request: Request):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
     doc = status_obj.model_dump()
     doc['timestamp'] = doc['timestamp'].isoformat()
     
-    _ = await db.status_checks.insert_one(doc)
+    _ = await request.app.state.db.status_checks.insert_one(doc)
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+async def get_status_checks(request: Request):
+    status_checks = await request.app.state.db.status_checks.find({}, {"_id": 0}).to_list(1000)
     
     for check in status_checks:
         if isinstance(check['timestamp'], str):
@@ -281,10 +804,11 @@ async def get_status_checks():
 
 # Ethereum endpoints
 @api_router.get("/eth/balance/{address}", response_model=EthBalance)
-async def get_eth_balance(address: str):
+async def get_eth_balance(address: str, request: Request):
     """Get Ethereum balance for an address"""
     try:
         data = await fetch_etherscan_balance(
+            request.app.state,
             address,
             chain_id=ETH_CHAIN_ID,
             symbol="ETH",
@@ -307,10 +831,11 @@ async def get_eth_balance(address: str):
 
 # Polygon endpoints
 @api_router.get("/polygon/balance/{address}", response_model=EthBalance)
-async def get_polygon_balance(address: str):
+async def get_polygon_balance(address: str, request: Request):
     """Get Polygon balance for an address"""
     try:
         data = await fetch_etherscan_balance(
+            request.app.state,
             address,
             chain_id=POLYGON_AMOY_CHAIN_ID,
             symbol="MATIC",
@@ -331,15 +856,29 @@ async def get_polygon_balance(address: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.get("/polygon/txs/{address}", response_model=List[EthTransaction])
-async def get_polygon_transactions(address: str, limit: int = 3):
+@api_router.get(
+    "/polygon/txs/{address}",
+    response_model=List[EthTransaction],
+    response_model_exclude_unset=True,
+)
+async def get_polygon_transactions(
+    address: str,
+    request: Request,
+    limit: int = 3,
+    usd_at_time: bool = False,
+):
     """Get recent Polygon transactions for an address"""
     try:
         transactions = await fetch_etherscan_transactions(
+            request.app.state,
             address,
             chain_id=POLYGON_AMOY_CHAIN_ID,
             limit=limit,
         )
+        if usd_at_time:
+            transactions = await attach_usd_at_time(
+                request.app.state, transactions, chain_id=POLYGON_AMOY_CHAIN_ID
+            )
         return [EthTransaction(**tx) for tx in transactions]
     except (httpx.HTTPError, EtherscanError) as e:
         raise HTTPException(status_code=503, detail=f"Etherscan API unavailable: {str(e)}")
@@ -347,15 +886,29 @@ async def get_polygon_transactions(address: str, limit: int = 3):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.get("/eth/txs/{address}", response_model=List[EthTransaction])
-async def get_eth_transactions(address: str, limit: int = 3):
+@api_router.get(
+    "/eth/txs/{address}",
+    response_model=List[EthTransaction],
+    response_model_exclude_unset=True,
+)
+async def get_eth_transactions(
+    address: str,
+    request: Request,
+    limit: int = 3,
+    usd_at_time: bool = False,
+):
     """Get recent transactions for an address"""
     try:
         transactions = await fetch_etherscan_transactions(
+            request.app.state,
             address,
             chain_id=ETH_CHAIN_ID,
             limit=limit,
         )
+        if usd_at_time:
+            transactions = await attach_usd_at_time(
+                request.app.state, transactions, chain_id=ETH_CHAIN_ID
+            )
         return [EthTransaction(**tx) for tx in transactions]
     except (httpx.HTTPError, EtherscanError) as e:
         raise HTTPException(status_code=503, detail=f"Etherscan API unavailable: {str(e)}")
@@ -363,6 +916,16 @@ async def get_eth_transactions(address: str, limit: int = 3):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Multi-chain portfolio endpoint
+@api_router.get("/portfolio/{address}", response_model=PortfolioSnapshot)
+async def get_portfolio(address: str, request: Request):
+    """Native and ERC-20 holdings of an address across all configured chains"""
+    try:
+        return await build_portfolio(request.app.state, address)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @api_router.get(
     "/emergent/etherscan/balance/{address}",
     response_model=EmergentAgentBalance
@@ -460,6 +1023,7 @@ async def emergent_agent_health_check():
 @api_router.post("/webhook/phoenix")
 async def phoenix_webhook(
     payload: Dict[str, Any],
+    request: Request,
     x_signature: Optional[str] = Header(None)
 ):
     """Receive webhooks from Phoenix Forense system"""
@@ -477,15 +1041,17 @@ async def phoenix_webhook(
         if not hmac.compare_digest(x_signature, expected_signature):
             raise HTTPException(status_code=401, detail="Invalid signature")
     
-    # Store raw payload in MongoDB
+    # Store raw payload alongside the indexed case fields
+    received_at = datetime.now(timezone.utc)
     doc = {
         'type': 'phoenix_webhook',
+        **extract_event_fields(payload, received_at=received_at),
         'payload': payload,
         'signature': x_signature,
-        'received_at': datetime.now(timezone.utc)
+        'received_at': received_at
     }
     
-    result = await db.phoenix_webhooks.insert_one(doc)
+    result = await request.app.state.db.phoenix_webhooks.insert_one(doc)
     
     return {
         'status': 'received',
@@ -495,9 +1061,9 @@ async def phoenix_webhook(
 
 
 @api_router.get("/webhook/phoenix/recent")
-async def get_recent_phoenix_webhooks(limit: int = 10):
+async def get_recent_phoenix_webhooks(request: Request, limit: int = 10):
     """Get recent Phoenix webhooks"""
-    webhooks = await db.phoenix_webhooks.find(
+    webhooks = await request.app.state.db.phoenix_webhooks.find(
         {'type': 'phoenix_webhook'},
         {'_id': 0}
     ).sort('received_at', -1).limit(limit).to_list(limit)
@@ -505,16 +1071,62 @@ async def get_recent_phoenix_webhooks(limit: int = 10):
     return webhooks
 
 
-# Include the router in the main app
-app.include_router(api_router)
+@api_router.get("/webhook/phoenix/cases", response_model=List[PhoenixCaseSummary])
+async def get_phoenix_case_summaries(
+    request: Request,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 50,
+):
+    """Per-case event counts and latest events, aggregated server-side."""
+    pipeline = case_summaries_pipeline(
+        event_type=event_type,
+        since=since,
+        until=until,
+        limit=limit,
+    )
+    # The pre-sort over all cases may exceed the 100 MB in-memory sort limit
+    cursor = request.app.state.db.phoenix_webhooks.aggregate(pipeline, allowDiskUse=True)
+    return await cursor.to_list(None)
+
+
+@api_router.get("/webhook/phoenix/cases/{case_id}", response_model=PhoenixCaseDetail)
+async def get_phoenix_case_detail(
+    case_id: str,
+    request: Request,
+    bucket: str = "day",
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    recent: int = 10,
+):
+    """Summary, timeline and most recent events of a case in a single query."""
+    try:
+        pipeline = case_detail_pipeline(
+            case_id,
+            bucket=bucket,
+            event_type=event_type,
+            since=since,
+            until=until,
+            recent=recent,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    cursor = request.app.state.db.phoenix_webhooks.aggregate(pipeline, allowDiskUse=True)
+    results = await cursor.to_list(1)
+    facets = results[0] if results else {}
+    if not facets.get('summary'):
+        raise HTTPException(status_code=404, detail=f"No events found for case {case_id}")
+
+    return PhoenixCaseDetail(
+        summary=facets['summary'][0],
+        bucket=bucket,
+        timeline=facets['timeline'],
+        recent_events=facets['recent_events'],
+    )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
 # Configure logging
 logging.basicConfig(
@@ -523,7 +1135,220 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
 
+async def admission_control(request: Request, call_next):
+    """Shed upstream-bound requests that cannot get a slot within the wait budget."""
+    state = request.app.state
+    limiter = state.admission.limiter_for(request.url.path)
+    if limiter is None or is_cache_hit_request(state, request.url.path, request.query_params):
+        return await call_next(request)
+
+    try:
+        async with limiter.slot():
+            return await call_next(request)
+    except AdmissionRejected as exc:
+        return JSONResponse(
+            status_code=429,
+            content={'detail': str(exc)},
+            headers={'Retry-After': str(exc.retry_after)},
+        )
+
+
+# Startup warmup
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'true').lower() in ('1', 'true', 'yes')
+WARMUP_TIMEOUT = float(os.environ.get('WARMUP_TIMEOUT', '10'))
+# Most recently updated balance/transaction entries loaded from MongoDB on startup
+WARMUP_HYDRATE_LIMIT = int(os.environ.get('WARMUP_HYDRATE_LIMIT', '200'))
+
+# (keys, options) pairs for ``create_index`` on the Etherscan cache collection
+ETH_CACHE_INDEXES = [
+    ([("type", 1), ("address", 1)], {"name": "type_address"}),
+    ([("type", 1), ("updated_at", -1)], {"name": "type_updated_at"}),
+]
+
+
+async def ensure_indexes(state: State) -> None:
+    """Create indexes and backfill old webhook events; failures are only logged."""
+
+    try:
+        for keys, options in PHOENIX_WEBHOOK_INDEXES:
+            await state.db.phoenix_webhooks.create_index(keys, **options)
+        for keys, options in ETH_CACHE_INDEXES:
+            await state.db.eth_cache.create_index(keys, **options)
+        await backfill_phoenix_webhooks(state)
+    except Exception as e:
+        logger.warning("MongoDB index setup failed: %s", e)
+
+
+async def backfill_phoenix_webhooks(state: State) -> None:
+    """Copy the case fields of old webhook events once per database.
+
+    The backfill filter scans the whole collection, so completion is recorded
+    in ``migrations`` and later worker starts only look up that marker.
+    """
+
+    if await state.db.migrations.find_one({'_id': PHOENIX_BACKFILL_MIGRATION_ID}):
+        return
+    result = await state.db.phoenix_webhooks.update_many(
+        PHOENIX_BACKFILL_FILTER, phoenix_backfill_update()
+    )
+    await state.db.migrations.update_one(
+        {'_id': PHOENIX_BACKFILL_MIGRATION_ID},
+        {'$set': {
+            'applied_at': datetime.now(timezone.utc),
+            'modified_count': result.modified_count,
+        }},
+        upsert=True,
+    )
+
+
+async def hydrate_cache(state: State) -> int:
+    """Load recently stored balances and transactions into the in-memory cache.
+
+    Every loaded key is also seeded into the access ranking at twice the
+    warmer's minimum score. Scores halve every half-life, so the warmer keeps
+    refreshing these keys for one half-life unless real traffic keeps them hot.
+    Returns the number of entries still fresh enough to be served.
+    """
+
+    cache_types = [
+        f"{prefix}:{chain_id}"
+        for chain_id in WARMED_BALANCE_CHAINS
+        for prefix in ('balance', 'transactions')
+    ]
+    docs = await state.db.eth_cache.find(
+        {'type': {'$in': cache_types}},
+        {'_id': 0},
+    ).sort('updated_at', -1).limit(WARMUP_HYDRATE_LIMIT).to_list(WARMUP_HYDRATE_LIMIT)
+
+    seed_score = 2 * state.cache_warmer.min_score
+    hydrated = 0
+    for doc in docs:
+        prefix, chain_id = doc['type'].split(':')
+        chain_id = int(chain_id)
+        kind = 'balance' if prefix == 'balance' else 'txs'
+        address = doc['address']
+
+        state.access_tracker.record(kind, chain_id, address, weight=seed_score)
+        if not is_cache_valid({'cached_at': doc['cached_at']}):
+            continue
+
+        if kind == 'balance':
+            data = _balance_from_doc(doc, WARMED_BALANCE_CHAINS[chain_id][0])
+        else:
+            data = doc.get('transactions', [])
+        state.cache_store.setdefault(
+            get_cache_key(f"{kind}:{chain_id}:{address}"),
+            {'data': data, 'cached_at': doc['cached_at']},
+        )
+        hydrated += 1
+    return hydrated
+
+
+async def warm_up(state: State) -> None:
+    """Preload stored price series, recent cache entries and the spot price quotes."""
+
+    for coin_id in PRICE_HISTORY_ASSETS.values():
+        await state.price_history.load(coin_id)
+
+    results = await asyncio.gather(
+        hydrate_cache(state),
+        get_eth_price_usd(),
+        get_matic_price_usd(),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Startup warmup step failed: %s", result)
+
+
+async def prepare_worker(state: State) -> None:
+    """Wait for MongoDB, set up indexes, warm up, then mark the worker ready."""
+
+    while True:
+        try:
+            await state.db.command('ping')
+            break
+        except Exception as e:
+            logger.warning("MongoDB not reachable yet: %s", e)
+            await asyncio.sleep(1)
+
+    await ensure_indexes(state)
+
+    if WARMUP_ON_START:
+        try:
+            await asyncio.wait_for(warm_up(state), WARMUP_TIMEOUT)
+        except Exception as e:
+            logger.warning("Startup warmup incomplete: %s", e)
+
+    if CACHE_WARMER_ENABLED:
+        state.cache_warmer.start()
+    state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open MongoDB and upstream pools once per worker and prepare it in the background.
+
+    Nothing here waits on the network: connecting, index setup and warmup run
+    in a background task and ``/api/ready`` reports 503 until it finishes.
+    """
+
+    state = app.state
+    # tz_aware so stored ``cached_at`` values compare with aware datetimes
+    state.client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    state.db = state.client[os.environ['DB_NAME']]
+    await upstream.open_client()
+
+    prepare_task = asyncio.create_task(prepare_worker(state))
+    try:
+        yield
+    finally:
+        state.ready = False
+        prepare_task.cancel()
+        try:
+            await prepare_task
+        except asyncio.CancelledError:
+            pass
+        await state.cache_warmer.stop()
+        await upstream.close_client()
+        state.client.close()
+
+
+def create_app() -> FastAPI:
+    """Build the application and its per-app state.
+
+    Connections are opened by the lifespan, not here, and handlers read all
+    shared resources from ``request.app.state``.
+    """
+
+    # Create the main app without a prefix
+    app = FastAPI(lifespan=lifespan)
+
+    state = app.state
+    state.ready = False
+    state.client = None
+    state.db = None
+    state.cache_store = {}
+    # Portfolio builds in flight, keyed like cache_store
+    state.portfolio_builds = {}
+    state.admission = build_admission_controller()
+    state.price_history = PriceHistoryStore()
+    state.access_tracker = build_access_tracker()
+    state.cache_warmer = build_cache_warmer(state)
+
+    # Include the router in the main app
+    app.include_router(api_router)
+
+    app.middleware("http")(admission_control)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    return app
+
+
+app = create_app()
@@ -1,5 +1,25 @@
 """Service helpers for the AmoyPhoenix backend."""
 
-from . import emergent_agent, pricing, etherscan_v2  # noqa: F401
+from . import (  # noqa: F401
+    admission,
+    cache_warmer,
+    chains,
+    emergent_agent,
+    pricing,
+    etherscan_v2,
+    phoenix_events,
+    price_history,
+    upstream,
+)
 
-__all__ = ["emergent_agent", "pricing", "etherscan_v2"]
+__all__ = [
+    "admission",
+    "cache_warmer",
+    "chains",
+    "emergent_agent",
+    "pricing",
+    "etherscan_v2",
+    "phoenix_events",
+    "price_history",
+    "upstream",
+]
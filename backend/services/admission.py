@@ -0,0 +1,94 @@
+"""Per-route-class admission control for upstream-bound API routes."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a request cannot be admitted within its queue-wait budget."""
+
+    def __init__(self, route_class: str, retry_after: int) -> None:
+        super().__init__(f"Too many concurrent {route_class} requests")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+class RouteLimiter:
+    """Bound the number of in-flight requests for one route class.
+
+    Requests wait at most ``queue_timeout`` seconds for a slot, and are
+    rejected immediately once ``max_queue`` requests are already waiting.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int = 1,
+    ) -> None:
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = max(0.0, queue_timeout)
+        self.retry_after = max(1, retry_after)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _reject(self) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(self.name, self.retry_after)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue or self.queue_timeout == 0:
+                raise self._reject()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject() from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionController:
+    """Map request paths to route classes and their limiters."""
+
+    def __init__(self, prefixes: Dict[str, RouteLimiter]) -> None:
+        # Longest prefix first so nested prefixes win over broader ones.
+        self._prefixes = sorted(prefixes.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def limiter_for(self, path: str) -> Optional[RouteLimiter]:
+        for prefix, limiter in self._prefixes:
+            if path.startswith(prefix):
+                return limiter
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {limiter.name: limiter.stats() for _, limiter in self._prefixes}
@@ -0,0 +1,169 @@
+"""Access-frequency tracking and proactive refresh of hot cache entries."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (kind, chain_id, address), e.g. ("balance", 1, "0xabc...")
+CacheKey = Tuple[str, int, str]
+
+
+class AccessTracker:
+    """Exponentially decayed request counts per cache key.
+
+    Each access adds one to the key's score and scores halve every
+    ``half_life`` seconds, so the ranking follows recent demand. The number
+    of tracked keys is bounded by ``max_entries``; the coldest keys are
+    dropped first.
+    """
+
+    def __init__(
+        self,
+        *,
+        half_life: float = 300.0,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.half_life = half_life
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._entries: Dict[CacheKey, Tuple[float, float]] = {}
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def record(self, kind: str, chain_id: int, address: str, *, weight: float = 1.0) -> None:
+        """Count an access; ``weight`` seeds several at once (e.g. on startup)."""
+
+        now = self._clock()
+        key = (kind, chain_id, address)
+        score, updated_at = self._entries.get(key, (0.0, now))
+        self._entries[key] = (self._decayed(score, updated_at, now) + weight, now)
+        if len(self._entries) > self.max_entries:
+            self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        keep = self.max_entries * 3 // 4
+        hottest = heapq.nlargest(
+            keep,
+            self._entries.items(),
+            key=lambda item: self._decayed(item[1][0], item[1][1], now),
+        )
+        self._entries = dict(hottest)
+
+    def top_k(self, k: int, *, min_score: float = 0.0) -> Dict[int, List[Tuple[CacheKey, float]]]:
+        """Return up to ``k`` hottest keys per chain, hottest first."""
+
+        now = self._clock()
+        per_chain: Dict[int, List[Tuple[CacheKey, float]]] = {}
+        for key, (score, updated_at) in self._entries.items():
+            decayed = self._decayed(score, updated_at, now)
+            if decayed >= min_score:
+                per_chain.setdefault(key[1], []).append((key, decayed))
+        return {
+            chain_id: heapq.nlargest(k, scored, key=lambda item: item[1])
+            for chain_id, scored in per_chain.items()
+        }
+
+
+class CacheWarmer:
+    """Background task refreshing hot cache entries shortly before they expire.
+
+    Parameters
+    ----------
+    tracker:
+        Source of per-chain access rankings.
+    refresh:
+        Coroutine re-fetching one key from upstream and storing it in the cache.
+    expires_in:
+        Seconds until the cached value for a key expires (``<= 0`` when missing).
+    top_k:
+        Number of hottest keys considered per chain.
+    interval:
+        Seconds between refresh passes; should be shorter than ``lead_time``.
+    lead_time:
+        Refresh keys whose remaining TTL is at most this many seconds.
+    calls_per_second, quota_share:
+        Upstream rate limit and the share of it the warmer may consume. The
+        budget is per process: with several workers, pass each its own
+        fraction of the share.
+    """
+
+    def __init__(
+        self,
+        tracker: AccessTracker,
+        *,
+        refresh: Callable[[str, int, str], Awaitable[object]],
+        expires_in: Callable[[str, int, str], float],
+        top_k: int = 20,
+        interval: float = 2.0,
+        lead_time: float = 5.0,
+        min_score: float = 2.0,
+        calls_per_second: float = 5.0,
+        quota_share: float = 0.2,
+    ) -> None:
+        self.tracker = tracker
+        self._refresh = refresh
+        self._expires_in = expires_in
+        self.top_k = top_k
+        self.interval = interval
+        self.lead_time = lead_time
+        self.min_score = min_score
+        self.calls_per_tick = calls_per_second * quota_share * interval
+        self._credit = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+
+    def _due(self) -> List[Tuple[CacheKey, float]]:
+        due = [
+            (key, score)
+            for ranked in self.tracker.top_k(self.top_k, min_score=self.min_score).values()
+            for key, score in ranked
+            if self._expires_in(*key) <= self.lead_time
+        ]
+        due.sort(key=lambda item: item[1], reverse=True)
+        return due
+
+    async def run_once(self) -> int:
+        """Refresh due keys within this tick's upstream budget."""
+
+        self._credit = min(self._credit + self.calls_per_tick, max(1.0, self.calls_per_tick))
+        batch = [key for key, _ in self._due()][:int(self._credit)]
+        refreshed = 0
+        for key in batch:
+            self._credit -= 1.0
+            try:
+                await self._refresh(*key)
+            except Exception as exc:  # upstream errors must not stop the loop
+                self.failed += 1
+                logger.warning("Cache warmer failed to refresh %s: %s", key, exc)
+            else:
+                refreshed += 1
+        self.refreshed += refreshed
+        return refreshed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,51 @@
+"""Config-driven registry of the EVM chains served through Etherscan API v2."""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class ChainConfig:
+    """Static description of a chain and how to price its assets.
+
+    ``coingecko_id`` identifies the native asset for spot and historical
+    prices; ``coingecko_platform`` is the asset platform used to price
+    ERC-20 tokens by contract address (``None`` for testnets). Assets on
+    ``is_testnet`` chains have no market value and are never priced, neither
+    in portfolio totals nor in historical transaction values.
+    """
+
+    chain_id: int
+    name: str
+    symbol: str
+    coingecko_id: Optional[str] = None
+    coingecko_platform: Optional[str] = None
+    decimals: int = 18
+    is_testnet: bool = False
+
+
+DEFAULT_CHAINS = (
+    ChainConfig(1, "ethereum", "ETH", "ethereum", "ethereum"),
+    ChainConfig(80_002, "polygon-amoy", "MATIC", "matic-network", None, is_testnet=True),
+)
+
+
+def load_chain_registry(path: Optional[str] = None) -> Dict[int, ChainConfig]:
+    """Return the configured chains keyed by chain id.
+
+    ``path`` (or ``CHAIN_REGISTRY_PATH``) points to a JSON list of objects with
+    the ``ChainConfig`` fields; without it the built-in defaults are used.
+    """
+
+    path = path or os.getenv("CHAIN_REGISTRY_PATH")
+    if not path:
+        return {chain.chain_id: chain for chain in DEFAULT_CHAINS}
+
+    entries = json.loads(Path(path).read_text())
+    chains = [ChainConfig(**entry) for entry in entries]
+    return {chain.chain_id: chain for chain in chains}
@@ -6,6 +6,8 @@ from typing import Any, Dict, List
 
 import httpx
 
+from . import upstream
+
 DEFAULT_AGENT_URL = "https://etherscan-query.preview.emergentagent.com"
 
 
@@ -21,10 +23,9 @@ async def _perform_request(
 ) -> Dict[str, Any]:
     """Execute a GET request against the Emergent Agent endpoint."""
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(base_url, params=params)
-        response.raise_for_status()
-        payload = response.json()
+    response = await upstream.get(base_url, params=params, timeout=timeout)
+    response.raise_for_status()
+    payload = response.json()
 
     if payload.get("status") != "1":
         message = payload.get("message", "Unknown error from Emergent Agent")
@@ -5,10 +5,14 @@ from __future__ import annotations
 import os
 from typing import Any, Dict, List
 
-import httpx
+from . import upstream
 
 ETHERSCAN_V2_URL = "https://api.etherscan.io/v2/api"
 API_KEY = os.getenv("ETHERSCAN_API_KEY", "")
+# Calls per second allowed by the API key; shared by every request of this process.
+CALLS_PER_SECOND = float(os.getenv("ETHERSCAN_CALLS_PER_SECOND", "5"))
+
+rate_limiter = upstream.RateLimiter(CALLS_PER_SECOND)
 
 
 class EtherscanError(RuntimeError):
@@ -40,10 +44,10 @@ async def _perform_request(
         "apikey": API_KEY,
     })
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(ETHERSCAN_V2_URL, params=request_params)
-        response.raise_for_status()
-        payload = response.json()
+    await rate_limiter.acquire()
+    response = await upstream.get(ETHERSCAN_V2_URL, params=request_params, timeout=timeout)
+    response.raise_for_status()
+    payload = response.json()
 
     status = payload.get("status")
     if status not in (None, "1", 1):
@@ -111,3 +115,49 @@ async def get_account_transactions(
     )
     transactions = _extract_transactions(payload)
     return transactions[:limit]
+
+
+async def get_token_transfers(
+    address: str, *, chain_id: int, limit: int = 1000
+) -> List[Dict[str, Any]]:
+    """Return the most recent ERC-20 transfer events involving the address."""
+
+    try:
+        payload = await _perform_request(
+            {
+                "module": "account",
+                "action": "tokentx",
+                "address": address,
+                "startblock": 0,
+                "endblock": 999_999_999,
+                "page": 1,
+                "offset": max(1, limit),
+                "sort": "desc",
+            },
+            chain_id=chain_id,
+        )
+    except EtherscanError as exc:
+        # Etherscan reports an address without transfers as an error payload.
+        if str(exc) == "No transactions found":
+            return []
+        raise
+    transactions = _extract_transactions(payload)
+    return transactions[:limit]
+
+
+async def get_token_balance(
+    address: str, contract_address: str, *, chain_id: int
+) -> str:
+    """Return the ERC-20 balance (in the token's base units) for the address."""
+
+    payload = await _perform_request(
+        {
+            "module": "account",
+            "action": "tokenbalance",
+            "contractaddress": contract_address,
+            "address": address,
+            "tag": "latest",
+        },
+        chain_id=chain_id,
+    )
+    return _extract_balance(payload)
@@ -0,0 +1,247 @@
+"""Ingestion helpers and aggregation pipelines for Phoenix Forense webhook events."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+TIMELINE_BUCKETS = ("hour", "day", "week", "month")
+
+# Upper bounds for caller-supplied sizes; every recent event carries its full
+# payload inside a single ``$facet`` document, which is capped at 16 MB.
+MAX_CASE_SUMMARIES = 200
+MAX_RECENT_EVENTS = 50
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+def _optional_str(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+def extract_event_fields(
+    payload: Dict[str, Any], *, received_at: datetime
+) -> Dict[str, Any]:
+    """Return the indexed top-level fields for a raw webhook payload.
+
+    Payloads that do not follow ``PhoenixWebhookPayload`` are still accepted;
+    missing identifiers are stored as ``None`` and the event time falls back
+    to the reception time.
+    """
+
+    event_at = _parse_timestamp(payload.get("timestamp")) or received_at
+    return {
+        "event_type": _optional_str(payload.get("event_type")),
+        "case_id": _optional_str(payload.get("case_id")),
+        "evidence_id": _optional_str(payload.get("evidence_id")),
+        "event_at": event_at,
+    }
+
+
+def _string_from_payload(field: str) -> Dict[str, Any]:
+    return {"$let": {
+        "vars": {"value": {"$convert": {
+            "input": f"$payload.{field}",
+            "to": "string",
+            "onError": None,
+            "onNull": None,
+        }}},
+        "in": {"$cond": [{"$eq": ["$$value", ""]}, None, "$$value"]},
+    }}
+
+
+# Events stored before the case fields were extracted at ingestion. No index
+# serves this filter, so the backfill runs once and is then recorded under
+# ``BACKFILL_MIGRATION_ID`` in the migrations collection.
+BACKFILL_FILTER = {"type": "phoenix_webhook", "event_at": {"$exists": False}}
+BACKFILL_MIGRATION_ID = "phoenix_webhook_event_fields"
+
+
+def backfill_update() -> List[Dict[str, Any]]:
+    """Update pipeline copying the case fields of old events out of ``payload``.
+
+    Follows ``extract_event_fields`` except for numeric timestamps: only
+    string and date values are parsed, anything else falls back to
+    ``received_at``.
+    """
+
+    timestamp = "$payload.timestamp"
+    return [{"$set": {
+        "event_type": _string_from_payload("event_type"),
+        "case_id": _string_from_payload("case_id"),
+        "evidence_id": _string_from_payload("evidence_id"),
+        "event_at": {"$ifNull": [
+            {"$cond": [
+                {"$in": [{"$type": timestamp}, ["string", "date"]]},
+                {"$convert": {"input": timestamp, "to": "date", "onError": None, "onNull": None}},
+                None,
+            ]},
+            "$received_at",
+        ]},
+    }}]
+
+
+# (keys, options) pairs for ``create_index`` on the webhook collection.
+INDEXES = [
+    ([("case_id", 1), ("event_at", -1)], {"name": "case_event_at"}),
+    ([("case_id", 1), ("event_type", 1), ("event_at", -1)], {"name": "case_type_event_at"}),
+    ([("event_type", 1), ("event_at", -1)], {"name": "type_event_at"}),
+    ([("evidence_id", 1)], {"name": "evidence_id", "sparse": True}),
+    ([("received_at", -1)], {"name": "received_at"}),
+]
+
+
+def _match_stage(
+    *,
+    case_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    match: Dict[str, Any] = {"type": "phoenix_webhook"}
+    if case_id is not None:
+        match["case_id"] = case_id
+    else:
+        match["case_id"] = {"$ne": None}
+    if event_type is not None:
+        match["event_type"] = event_type
+    window: Dict[str, Any] = {}
+    if since is not None:
+        window["$gte"] = since
+    if until is not None:
+        window["$lt"] = until
+    if window:
+        match["event_at"] = window
+    return {"$match": match}
+
+
+_LATEST_EVENT_PROJECTION = {
+    "event_type": "$event_type",
+    "evidence_id": "$evidence_id",
+    "event_at": "$event_at",
+    "received_at": "$received_at",
+}
+
+
+def _summary_stages() -> List[Dict[str, Any]]:
+    """Group matched events into one document per case.
+
+    Expects its input sorted by ``event_at`` descending so that ``$first``
+    picks the most recent event of each group.
+    """
+
+    return [
+        {"$group": {
+            "_id": {"case_id": "$case_id", "event_type": "$event_type"},
+            "count": {"$sum": 1},
+            "evidence_ids": {"$addToSet": "$evidence_id"},
+            "first_event_at": {"$min": "$event_at"},
+            "last_event_at": {"$max": "$event_at"},
+            "latest_event": {"$first": _LATEST_EVENT_PROJECTION},
+        }},
+        {"$sort": {"last_event_at": -1}},
+        {"$group": {
+            "_id": "$_id.case_id",
+            "total_events": {"$sum": "$count"},
+            "evidence_ids": {"$push": "$evidence_ids"},
+            "first_event_at": {"$min": "$first_event_at"},
+            "last_event_at": {"$max": "$last_event_at"},
+            "latest_event": {"$first": "$latest_event"},
+            "by_type": {"$push": {"event_type": "$_id.event_type", "count": "$count"}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "case_id": "$_id",
+            "total_events": 1,
+            "evidence_count": {"$size": {"$setDifference": [
+                {"$reduce": {
+                    "input": "$evidence_ids",
+                    "initialValue": [],
+                    "in": {"$setUnion": ["$$value", "$$this"]},
+                }},
+                [None],
+            ]}},
+            "first_event_at": 1,
+            "last_event_at": 1,
+            "latest_event": 1,
+            "by_type": 1,
+        }},
+    ]
+
+
+def case_summaries_pipeline(
+    *,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """Per-case counts and latest-event summaries, most recently active first."""
+
+    return [
+        _match_stage(event_type=event_type, since=since, until=until),
+        {"$sort": {"event_at": -1}},
+        *_summary_stages(),
+        {"$sort": {"last_event_at": -1}},
+        {"$limit": min(max(1, limit), MAX_CASE_SUMMARIES)},
+    ]
+
+
+def case_detail_pipeline(
+    case_id: str,
+    *,
+    bucket: str = "day",
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    recent: int = 10,
+) -> List[Dict[str, Any]]:
+    """Summary, per-type timeline and most recent events of a single case."""
+
+    if bucket not in TIMELINE_BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(TIMELINE_BUCKETS)}")
+
+    return [
+        _match_stage(case_id=case_id, event_type=event_type, since=since, until=until),
+        {"$sort": {"event_at": -1}},
+        {"$facet": {
+            "summary": _summary_stages(),
+            "timeline": [
+                {"$group": {
+                    "_id": {
+                        "bucket": {"$dateTrunc": {"date": "$event_at", "unit": bucket}},
+                        "event_type": "$event_type",
+                    },
+                    "count": {"$sum": 1},
+                }},
+                {"$group": {
+                    "_id": "$_id.bucket",
+                    "count": {"$sum": "$count"},
+                    "by_type": {"$push": {"event_type": "$_id.event_type", "count": "$count"}},
+                }},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "bucket_start": "$_id", "count": 1, "by_type": 1}},
+            ],
+            "recent_events": [
+                {"$limit": min(max(1, recent), MAX_RECENT_EVENTS)},
+                {"$project": {"_id": 0, **_LATEST_EVENT_PROJECTION, "payload": 1}},
+            ],
+        }},
+    ]
@@ -0,0 +1,267 @@
+"""Historical USD price series per asset, persisted locally as compact arrays."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from . import upstream
+
+logger = logging.getLogger(__name__)
+
+COINGECKO_RANGE_URL = "https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart/range"
+DEFAULT_STORE_DIR = Path(
+    os.getenv("PRICE_HISTORY_DIR", Path(__file__).resolve().parent.parent / ".price_history")
+)
+
+# Padding around requested windows so every timestamp has neighbouring samples.
+RANGE_PADDING = 86_400
+
+# Seconds during which a range that failed to download is not requested again.
+FAILED_RANGE_TTL = 300.0
+
+
+class PriceHistoryError(RuntimeError):
+    """Raised when a price range cannot be downloaded or decoded."""
+
+
+def epoch_seconds(value: datetime) -> int:
+    """Unix seconds of ``value``; naive datetimes (as stored by MongoDB) are UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class PriceSeries:
+    """Sorted USD price samples and the time span they are known to cover.
+
+    Timestamps are stored as ``int64`` seconds and prices as ``float32``,
+    which keeps a year of hourly samples well under 100 KB per asset.
+    """
+
+    __slots__ = ("timestamps", "prices", "covered_from", "covered_to")
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        prices: np.ndarray,
+        covered_from: int,
+        covered_to: int,
+    ) -> None:
+        self.timestamps = timestamps
+        self.prices = prices
+        self.covered_from = covered_from
+        self.covered_to = covered_to
+
+    @classmethod
+    def empty(cls) -> "PriceSeries":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), 0, 0)
+
+    @classmethod
+    def load(cls, path: Path) -> "PriceSeries":
+        with np.load(path) as data:
+            return cls(
+                data["timestamps"].astype(np.int64),
+                data["prices"].astype(np.float32),
+                int(data["coverage"][0]),
+                int(data["coverage"][1]),
+            )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.tmp.npz")
+        np.savez(
+            tmp_path,
+            timestamps=self.timestamps,
+            prices=self.prices,
+            coverage=np.array([self.covered_from, self.covered_to], dtype=np.int64),
+        )
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def merge(self, timestamps: np.ndarray, prices: np.ndarray, start: int, end: int) -> "PriceSeries":
+        """Return a new series including the samples downloaded for ``[start, end]``."""
+
+        all_ts = np.concatenate([self.timestamps, timestamps.astype(np.int64)])
+        all_prices = np.concatenate([self.prices, prices.astype(np.float32)])
+        # Keep the newest sample for duplicate timestamps.
+        order = np.argsort(all_ts, kind="stable")[::-1]
+        unique_ts, first = np.unique(all_ts[order], return_index=True)
+        merged_prices = all_prices[order][first]
+
+        if len(self):
+            covered_from, covered_to = min(self.covered_from, start), max(self.covered_to, end)
+        else:
+            covered_from, covered_to = start, end
+        return PriceSeries(unique_ts, merged_prices, covered_from, covered_to)
+
+    def missing_ranges(self, start: int, end: int, *, max_gap: int) -> List[Tuple[int, int]]:
+        """Ranges that must be downloaded before ``[start, end]`` can be valued.
+
+        Requests ending less than ``max_gap`` seconds after the covered span
+        are served from the last known samples instead of triggering a fetch.
+        """
+
+        if not len(self):
+            return [(start, end)]
+        missing = []
+        if start < self.covered_from:
+            missing.append((start, self.covered_from))
+        if end > self.covered_to + max_gap:
+            missing.append((self.covered_to, end))
+        return missing
+
+    def lookup(self, timestamps: np.ndarray, *, max_gap: int) -> np.ndarray:
+        """Linearly interpolated prices; ``NaN`` outside the covered span."""
+
+        if not len(self):
+            return np.full(len(timestamps), np.nan)
+        values = np.interp(timestamps, self.timestamps, self.prices.astype(np.float64))
+        outside = (timestamps < self.covered_from) | (timestamps > self.covered_to + max_gap)
+        values[outside] = np.nan
+        return values
+
+
+class PriceHistoryStore:
+    """Load, extend and query price series for CoinGecko asset ids.
+
+    Series are loaded from ``directory`` on first use; file reads and writes
+    run in worker threads. Only ranges they do not cover yet are downloaded,
+    so valuing transactions inside a loaded span makes no network calls. Ranges that fail to download are skipped for
+    ``failed_range_ttl`` seconds; timestamps inside them value as ``None``.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_STORE_DIR,
+        *,
+        max_gap: int = 3_600,
+        timeout: float = 15.0,
+        failed_range_ttl: float = FAILED_RANGE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_gap = max_gap
+        self.timeout = timeout
+        self.failed_range_ttl = failed_range_ttl
+        self._clock = clock
+        self._series: Dict[str, PriceSeries] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # coin id -> [(start, end, retry_at)] of recently failed downloads
+        self._failed: Dict[str, List[Tuple[int, int, float]]] = {}
+
+    def _path(self, coin_id: str) -> Path:
+        return self.directory / f"{coin_id}.npz"
+
+    async def load(self, coin_id: str) -> PriceSeries:
+        """Return the series for ``coin_id``, reading it from disk on first use."""
+
+        series = self._series.get(coin_id)
+        if series is None:
+            path = self._path(coin_id)
+            if await asyncio.to_thread(path.exists):
+                series = await asyncio.to_thread(PriceSeries.load, path)
+            else:
+                series = PriceSeries.empty()
+            series = self._series.setdefault(coin_id, series)
+        return series
+
+    async def _download(self, coin_id: str, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        params = {"vs_currency": "usd", "from": start, "to": end}
+        response = await upstream.get(
+            COINGECKO_RANGE_URL.format(coin_id=coin_id), params=params, timeout=self.timeout
+        )
+        response.raise_for_status()
+        payload = response.json()
+
+        try:
+            samples = np.asarray(payload["prices"], dtype=np.float64).reshape(-1, 2)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise PriceHistoryError(f"Unexpected price range response for {coin_id}") from exc
+        return (samples[:, 0] // 1000).astype(np.int64), samples[:, 1]
+
+    def _pending_ranges(
+        self, coin_id: str, series: PriceSeries, start: int, end: int
+    ) -> List[Tuple[int, int]]:
+        """Padded ranges to download for ``[start, end]``, minus recent failures."""
+
+        now = self._clock()
+        failed = [entry for entry in self._failed.get(coin_id, []) if entry[2] > now]
+        self._failed[coin_id] = failed
+
+        wall_now = int(time.time())
+        pending = []
+        for range_start, range_end in series.missing_ranges(
+            start, end, max_gap=self.max_gap
+        ):
+            range_start = max(0, range_start - RANGE_PADDING)
+            range_end = min(wall_now, range_end + RANGE_PADDING)
+            if any(range_start < f_end and f_start < range_end for f_start, f_end, _ in failed):
+                continue
+            pending.append((range_start, range_end))
+        return pending
+
+    def needs_download(self, coin_id: str, start: int, end: int) -> bool:
+        """Whether valuing ``[start, end]`` may need disk or network I/O.
+
+        Never touches the disk itself: a series that is not loaded yet
+        counts as needing work.
+        """
+
+        series = self._series.get(coin_id)
+        if series is None:
+            return True
+        return bool(self._pending_ranges(coin_id, series, start, end))
+
+    async def ensure_range(self, coin_id: str, start: int, end: int) -> PriceSeries:
+        """Return the series for ``coin_id`` after downloading any missing span."""
+
+        if not self.needs_download(coin_id, start, end):
+            return self._series[coin_id]
+
+        lock = self._locks.setdefault(coin_id, asyncio.Lock())
+        async with lock:
+            series = await self.load(coin_id)
+            merged = False
+            for range_start, range_end in self._pending_ranges(coin_id, series, start, end):
+                try:
+                    timestamps, prices = await self._download(coin_id, range_start, range_end)
+                except (httpx.HTTPError, PriceHistoryError) as exc:
+                    logger.warning(
+                        "Price range %s-%s for %s failed: %s", range_start, range_end, coin_id, exc
+                    )
+                    self._failed.setdefault(coin_id, []).append(
+                        (range_start, range_end, self._clock() + self.failed_range_ttl)
+                    )
+                    continue
+                series = series.merge(timestamps, prices, range_start, range_end)
+                merged = True
+            if merged:
+                await asyncio.to_thread(series.save, self._path(coin_id))
+                self._series[coin_id] = series
+        return series
+
+    async def usd_values(
+        self,
+        coin_id: str,
+        timestamps: Sequence[datetime],
+        amounts: Sequence[float],
+    ) -> List[Optional[float]]:
+        """Value ``amounts`` of the asset at the matching ``timestamps`` in one pass."""
+
+        if not timestamps:
+            return []
+        epochs = np.fromiter((epoch_seconds(ts) for ts in timestamps), dtype=np.int64, count=len(timestamps))
+        series = await self.ensure_range(coin_id, int(epochs.min()), int(epochs.max()))
+        values = series.lookup(epochs, max_gap=self.max_gap) * np.asarray(amounts, dtype=np.float64)
+        return [None if np.isnan(value) else float(value) for value in values]
@@ -2,19 +2,26 @@
 
 from __future__ import annotations
 
-from typing import Awaitable, Callable, Optional
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
 
-import httpx
+from . import upstream
 
 ETH_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd"
 MATIC_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price?ids=matic-network&vs_currencies=usd"
+SIMPLE_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+TOKEN_PRICE_URL = "https://api.coingecko.com/api/v3/simple/token_price/{platform}"
 
+class PricingError(RuntimeError):
+    """Raised when a price lookup returns an unusable payload."""
 
-async def _fetch_price(url: str) -> Optional[float]:
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        payload = response.json()
+
+# Spot quotes are reused for this many seconds (url -> (fetched_at, price)).
+SPOT_PRICE_TTL = 30.0
+_spot_prices: Dict[str, Tuple[float, float]] = {}
+
+
+def _parse_spot_price(payload: Dict) -> Optional[float]:
     try:
         if "ethereum" in payload:
             return float(payload["ethereum"]["usd"])
@@ -25,6 +32,68 @@ async def _fetch_price(url: str) -> Optional[float]:
     return None
 
 
+async def _fetch_price(url: str) -> Optional[float]:
+    cached = _spot_prices.get(url)
+    if cached and time.monotonic() - cached[0] < SPOT_PRICE_TTL:
+        return cached[1]
+
+    response = await upstream.get(url, timeout=10.0)
+    response.raise_for_status()
+    try:
+        payload = response.json()
+    except ValueError:
+        return None
+    price = _parse_spot_price(payload) if isinstance(payload, dict) else None
+    if price is not None:
+        _spot_prices[url] = (time.monotonic(), price)
+    return price
+
+
+async def _fetch_price_map(url: str, params: Dict[str, str]) -> Dict[str, float]:
+    response = await upstream.get(url, params=params, timeout=10.0)
+    response.raise_for_status()
+    try:
+        payload = response.json()
+    except ValueError as exc:
+        raise PricingError(f"Price response from {url} is not JSON") from exc
+    if not isinstance(payload, dict):
+        raise PricingError(f"Unexpected price response from {url}")
+
+    prices: Dict[str, float] = {}
+    for key, quote in payload.items():
+        try:
+            prices[key.lower()] = float(quote["usd"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return prices
+
+
+async def get_prices_usd(coin_ids: Iterable[str]) -> Dict[str, float]:
+    """Return USD spot prices for several CoinGecko ids in one request."""
+
+    ids = sorted(set(coin_ids))
+    if not ids:
+        return {}
+    return await _fetch_price_map(
+        SIMPLE_PRICE_URL,
+        {"ids": ",".join(ids), "vs_currencies": "usd"},
+    )
+
+
+async def get_token_prices_usd(
+    platform: str, contract_addresses: Iterable[str]
+) -> Dict[str, float]:
+    """Return USD prices keyed by lowercase contract address in one request."""
+
+    addresses = sorted({address.lower() for address in contract_addresses})
+    if not addresses:
+        return {}
+    return await _fetch_price_map(
+        TOKEN_PRICE_URL.format(platform=platform),
+        {"contract_addresses": ",".join(addresses), "vs_currencies": "usd"},
+    )
+
+
 async def get_eth_price_usd() -> Optional[float]:
     return await _fetch_price(ETH_PRICE_URL)
 
@@ -0,0 +1,88 @@
+"""Shared HTTP client for upstream APIs (Etherscan, CoinGecko, Emergent Agent)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+_users = 0
+
+
+async def open_client(*, max_connections: int = 100) -> httpx.AsyncClient:
+    """Create, or join, the process-wide connection pool used by all service helpers.
+
+    Each ``open_client`` must be paired with ``close_client``; the pool is
+    closed when its last user releases it.
+    """
+
+    global _client, _users
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+    _users += 1
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _users
+    _users = max(0, _users - 1)
+    if _client is not None and _users == 0:
+        await _client.aclose()
+        _client = None
+
+
+async def get(
+    url: str,
+    *,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float,
+) -> httpx.Response:
+    """Issue a GET through the shared pool, or a one-off client when none is open."""
+
+    if _client is not None:
+        return await _client.get(url, params=params, timeout=timeout)
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        return await client.get(url, params=params)
+
+
+class RateLimiter:
+    """Token bucket spacing calls to an upstream API to ``rate`` per second.
+
+    ``acquire`` waits until a token is available; bursts of up to ``burst``
+    calls pass immediately. A non-positive rate disables limiting.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated_at = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1.0
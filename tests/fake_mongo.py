@@ -0,0 +1,80 @@
+"""Minimal in-memory stand-in for the Motor collections used by ``server``."""
+
+from types import SimpleNamespace
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs if length is None else self.docs[:length]
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        # Canned aggregation results and the (pipeline, options) of each call
+        self.aggregate_results = []
+        self.aggregate_calls = []
+        self.update_many_calls = []
+
+    def find(self, query, projection=None):
+        return FakeCursor(doc for doc in self.docs if _matches(doc, query))
+
+    async def find_one(self, query, projection=None):
+        return next((doc for doc in self.docs if _matches(doc, query)), None)
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", len(self.docs) + 1)
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = await self.find_one(query)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(modified_count=0)
+            doc = dict(query)
+            self.docs.append(doc)
+        doc.update(update["$set"])
+        return SimpleNamespace(modified_count=1)
+
+    async def update_many(self, query, update):
+        self.update_many_calls.append((query, update))
+        return SimpleNamespace(modified_count=0)
+
+    def aggregate(self, pipeline, **options):
+        self.aggregate_calls.append((pipeline, options))
+        return FakeCursor(self.aggregate_results)
+
+
+class FakeDatabase:
+    """Collections are created on first access, as in Motor."""
+
+    def __init__(self, **collections):
+        self._collections = {name: FakeCollection(docs) for name, docs in collections.items()}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, FakeCollection())
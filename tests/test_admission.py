@@ -0,0 +1,213 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+import server
+from services.admission import AdmissionController, AdmissionRejected, RouteLimiter
+from services.price_history import PriceHistoryStore
+from tests.fake_mongo import FakeDatabase
+
+
+def _limiter(**overrides):
+    options = {"concurrency": 1, "max_queue": 1, "queue_timeout": 0.05, "retry_after": 3}
+    options.update(overrides)
+    return RouteLimiter("eth", **options)
+
+
+def test_fast_path_admits_and_releases():
+    limiter = _limiter()
+
+    async def scenario():
+        async with limiter.slot():
+            assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+    assert limiter.stats() == {"concurrency": 1, "in_flight": 0, "waiting": 0, "rejected": 0}
+
+
+def test_rejects_after_queue_timeout():
+    limiter = _limiter()
+
+    async def scenario():
+        held = asyncio.Event()
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                held.set()
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await held.wait()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with limiter.slot():
+                pass
+        release.set()
+        await holder
+        return excinfo.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.retry_after == 3
+    assert rejected.route_class == "eth"
+    assert limiter.rejected == 1
+    assert limiter.waiting == 0
+
+
+def test_rejects_immediately_when_queue_is_full():
+    limiter = _limiter(max_queue=0, queue_timeout=10)
+
+    async def scenario():
+        async with limiter.slot():
+            with pytest.raises(AdmissionRejected):
+                async with limiter.slot():
+                    pass
+
+    asyncio.run(scenario())
+    assert limiter.rejected == 1
+
+
+def test_waiter_is_admitted_when_slot_frees_in_time():
+    limiter = _limiter(queue_timeout=1)
+
+    async def scenario():
+        async def hold():
+            async with limiter.slot():
+                await asyncio.sleep(0.01)
+
+        async def wait():
+            await asyncio.sleep(0)
+            async with limiter.slot():
+                return "admitted"
+
+        return await asyncio.gather(hold(), wait())
+
+    assert asyncio.run(scenario())[1] == "admitted"
+    assert limiter.rejected == 0
+
+
+def test_slot_is_released_when_body_raises():
+    limiter = _limiter()
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("boom")
+        async with limiter.slot():
+            pass
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0
+    assert limiter.rejected == 0
+
+
+def test_controller_picks_longest_matching_prefix():
+    api = _limiter()
+    eth = _limiter()
+    controller = AdmissionController({"/api/": api, "/api/eth/": eth})
+
+    assert controller.limiter_for("/api/eth/balance/0x1") is eth
+    assert controller.limiter_for("/api/status") is api
+    assert controller.limiter_for("/health") is None
+
+
+ADDRESS = "0x" + "1" * 40
+OTHER_ADDRESS = "0x" + "2" * 40
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    app = server.create_app()
+    app.state.db = FakeDatabase()
+    app.state.price_history = PriceHistoryStore(tmp_path)
+    app.state.admission = AdmissionController({
+        "/api/eth/": RouteLimiter("eth", concurrency=1, max_queue=0, queue_timeout=0, retry_after=2),
+    })
+
+    async def slow_balance(address, *, chain_id):
+        await app.release.wait()
+        return "1000000000000000000"
+
+    async def fake_price():
+        return 2000.0
+
+    monkeypatch.setattr(server, "get_v2_balance", slow_balance)
+    monkeypatch.setattr(server, "get_eth_price_usd", fake_price)
+    return app
+
+
+def _run_with_client(app, scenario):
+    """Run ``scenario`` against the app; Etherscan balance calls wait for ``app.release``."""
+
+    async def main():
+        app.release = asyncio.Event()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+
+    return asyncio.run(main())
+
+
+def test_middleware_rejects_with_retry_after_when_class_is_full(app):
+    async def scenario(client):
+        first = asyncio.create_task(client.get(f"/api/eth/balance/{ADDRESS}"))
+        await asyncio.sleep(0.05)
+        rejected = [await client.get(f"/api/eth/balance/{OTHER_ADDRESS}") for _ in range(2)]
+        app.release.set()
+        return await first, rejected
+
+    first, rejected = _run_with_client(app, scenario)
+
+    assert first.status_code == 200
+    assert [r.status_code for r in rejected] == [429, 429]
+    assert all(r.headers["Retry-After"] == "2" for r in rejected)
+    assert app.state.admission.stats()["eth"]["rejected"] == 2
+
+
+def test_middleware_lets_cache_hits_bypass_a_full_class(app):
+    async def scenario(client):
+        app.release.set()
+        await client.get(f"/api/eth/balance/{ADDRESS}")
+
+        app.release.clear()
+        blocked = asyncio.create_task(client.get(f"/api/eth/balance/{OTHER_ADDRESS}"))
+        await asyncio.sleep(0.05)
+        cached = await client.get(f"/api/eth/balance/{ADDRESS}")
+        app.release.set()
+        await blocked
+        return cached
+
+    cached = _run_with_client(app, scenario)
+
+    assert cached.status_code == 200
+    assert cached.json()["balance_usd"] == 2000.0
+
+
+def test_middleware_counts_usd_at_time_without_local_prices_as_miss(app):
+    app.state.cache_store[server.get_cache_key(f"txs:{server.ETH_CHAIN_ID}:{ADDRESS}")] = {
+        "data": [{
+            "hash": "0xabc",
+            "from_address": ADDRESS,
+            "to_address": OTHER_ADDRESS,
+            "value_eth": 1.0,
+            "timestamp": datetime.now(timezone.utc),
+            "block_number": "1",
+            "gas_used": "21000",
+        }],
+        "cached_at": datetime.now(timezone.utc),
+    }
+
+    async def scenario(client):
+        blocked = asyncio.create_task(client.get(f"/api/eth/balance/{OTHER_ADDRESS}"))
+        await asyncio.sleep(0.05)
+        plain = await client.get(f"/api/eth/txs/{ADDRESS}")
+        valued = await client.get(f"/api/eth/txs/{ADDRESS}", params={"usd_at_time": "true"})
+        app.release.set()
+        await blocked
+        return plain, valued
+
+    plain, valued = _run_with_client(app, scenario)
+
+    assert plain.status_code == 200
+    assert valued.status_code == 429
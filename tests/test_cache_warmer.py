@@ -0,0 +1,104 @@
+import asyncio
+
+from services.cache_warmer import AccessTracker, CacheWarmer
+
+
+def test_tracker_decays_scores_by_half_life(clock):
+    tracker = AccessTracker(half_life=10, clock=clock)
+    for _ in range(4):
+        tracker.record("balance", 1, "0xa")
+
+    clock.now = 10
+    ((key, score),) = tracker.top_k(5)[1]
+    assert key == ("balance", 1, "0xa")
+    assert score == 2.0
+
+
+def test_tracker_ranks_per_chain_and_applies_min_score(clock):
+    tracker = AccessTracker(clock=clock)
+    for address, hits in (("0xa", 3), ("0xb", 5), ("0xc", 1)):
+        for _ in range(hits):
+            tracker.record("balance", 1, address)
+    tracker.record("txs", 80002, "0xd")
+    tracker.record("txs", 80002, "0xd")
+
+    ranked = tracker.top_k(2, min_score=2)
+    assert [key[2] for key, _ in ranked[1]] == ["0xb", "0xa"]
+    assert [key[2] for key, _ in ranked[80002]] == ["0xd"]
+
+
+def test_tracker_prunes_coldest_keys(clock):
+    tracker = AccessTracker(max_entries=4, clock=clock)
+    for index in range(4):
+        for _ in range(index + 1):
+            tracker.record("balance", 1, f"0x{index}")
+    tracker.record("balance", 1, "0xnew")
+
+    addresses = {key[2] for key, _ in tracker.top_k(10)[1]}
+    assert addresses == {"0x1", "0x2", "0x3"}
+
+
+def _warmer(tracker, refreshed, **options):
+    async def refresh(*key):
+        refreshed.append(key)
+
+    return CacheWarmer(tracker, refresh=refresh, expires_in=lambda *key: 0, **options)
+
+
+def test_run_once_stays_within_quota_budget(clock):
+    tracker = AccessTracker(clock=clock)
+    for address in ("0xa", "0xb", "0xc"):
+        for _ in range(3):
+            tracker.record("balance", 1, address)
+    refreshed = []
+    # 1 call/s * 0.5 share * 1s interval = half a refresh per pass
+    warmer = _warmer(tracker, refreshed, calls_per_second=1, quota_share=0.5, interval=1)
+
+    counts = [asyncio.run(warmer.run_once()) for _ in range(4)]
+
+    assert counts == [0, 1, 0, 1]
+    assert len(refreshed) == 2
+
+
+def test_run_once_skips_fresh_entries_and_cold_keys(clock):
+    tracker = AccessTracker(clock=clock)
+    tracker.record("balance", 1, "0xcold")
+    for _ in range(3):
+        tracker.record("balance", 1, "0xfresh")
+    refreshed = []
+
+    async def refresh(*key):
+        refreshed.append(key)
+
+    warmer = CacheWarmer(
+        tracker,
+        refresh=refresh,
+        expires_in=lambda *key: 30,
+        calls_per_second=10,
+        quota_share=1,
+    )
+
+    assert asyncio.run(warmer.run_once()) == 0
+    assert refreshed == []
+
+
+def test_refresh_failures_are_counted_and_do_not_stop_the_pass(clock):
+    tracker = AccessTracker(clock=clock)
+    for address in ("0xa", "0xb"):
+        for _ in range(3):
+            tracker.record("balance", 1, address)
+
+    async def refresh(kind, chain_id, address):
+        if address == "0xb":
+            raise RuntimeError("upstream down")
+
+    warmer = CacheWarmer(
+        tracker,
+        refresh=refresh,
+        expires_in=lambda *key: 0,
+        calls_per_second=10,
+        quota_share=1,
+    )
+
+    assert asyncio.run(warmer.run_once()) == 1
+    assert (warmer.refreshed, warmer.failed) == (1, 1)
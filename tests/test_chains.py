@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from services.chains import DEFAULT_CHAINS, ChainConfig, load_chain_registry
+
+
+def test_defaults_without_configuration(monkeypatch):
+    monkeypatch.delenv("CHAIN_REGISTRY_PATH", raising=False)
+
+    registry = load_chain_registry()
+
+    assert list(registry) == [1, 80_002]
+    assert registry[1] == DEFAULT_CHAINS[0]
+    assert registry[80_002].is_testnet
+    assert registry[80_002].coingecko_platform is None
+
+
+def test_loads_chains_from_json_file(tmp_path, monkeypatch):
+    path = tmp_path / "chains.json"
+    path.write_text(json.dumps([
+        {"chain_id": 137, "name": "polygon", "symbol": "POL",
+         "coingecko_id": "matic-network", "coingecko_platform": "polygon-pos"},
+        {"chain_id": 11155111, "name": "sepolia", "symbol": "ETH", "is_testnet": True},
+    ]))
+    monkeypatch.setenv("CHAIN_REGISTRY_PATH", str(path))
+
+    registry = load_chain_registry()
+
+    assert registry[137] == ChainConfig(137, "polygon", "POL", "matic-network", "polygon-pos")
+    assert registry[11155111].is_testnet
+    assert registry[11155111].decimals == 18
+
+
+def test_rejects_unknown_fields(tmp_path):
+    path = tmp_path / "chains.json"
+    path.write_text(json.dumps([{"chain_id": 1, "name": "x", "symbol": "X", "rpc": "http://"}]))
+
+    with pytest.raises(TypeError):
+        load_chain_registry(str(path))
@@ -0,0 +1,162 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from services.phoenix_events import (
+    BACKFILL_FILTER,
+    MAX_CASE_SUMMARIES,
+    MAX_RECENT_EVENTS,
+    backfill_update,
+    case_detail_pipeline,
+    case_summaries_pipeline,
+    extract_event_fields,
+)
+
+from tests.fake_mongo import FakeDatabase
+
+RECEIVED_AT = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def app():
+    # The lifespan is not entered, so nothing connects to MongoDB.
+    app = server.create_app()
+    app.state.db = FakeDatabase()
+    return app
+
+
+def test_extract_event_fields_normalises_identifiers_and_timestamp():
+    fields = extract_event_fields(
+        {"event_type": "evidence", "case_id": 42, "evidence_id": "", "timestamp": "2025-01-01T00:00:00Z"},
+        received_at=RECEIVED_AT,
+    )
+
+    assert fields == {
+        "event_type": "evidence",
+        "case_id": "42",
+        "evidence_id": None,
+        "event_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+    }
+
+
+def test_extract_event_fields_falls_back_to_received_at():
+    fields = extract_event_fields({"timestamp": "not a date"}, received_at=RECEIVED_AT)
+
+    assert fields["event_at"] == RECEIVED_AT
+    assert fields["case_id"] is None
+
+
+def test_case_summaries_pipeline_matches_cases_and_limits():
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    pipeline = case_summaries_pipeline(event_type="evidence", since=since, limit=5)
+
+    assert pipeline[0] == {"$match": {
+        "type": "phoenix_webhook",
+        "case_id": {"$ne": None},
+        "event_type": "evidence",
+        "event_at": {"$gte": since},
+    }}
+    assert pipeline[1] == {"$sort": {"event_at": -1}}
+    assert pipeline[-1] == {"$limit": 5}
+    assert pipeline[-3]["$project"]["case_id"] == "$_id"
+
+
+def test_case_detail_pipeline_facets():
+    pipeline = case_detail_pipeline("case-1", bucket="hour", recent=3)
+
+    assert pipeline[0]["$match"]["case_id"] == "case-1"
+    facets = pipeline[-1]["$facet"]
+    assert set(facets) == {"summary", "timeline", "recent_events"}
+    bucket = facets["timeline"][0]["$group"]["_id"]["bucket"]
+    assert bucket == {"$dateTrunc": {"date": "$event_at", "unit": "hour"}}
+    assert facets["recent_events"][0] == {"$limit": 3}
+
+
+def test_case_detail_pipeline_rejects_unknown_bucket():
+    with pytest.raises(ValueError):
+        case_detail_pipeline("case-1", bucket="minute")
+
+
+def test_backfill_targets_events_without_extracted_fields():
+    assert BACKFILL_FILTER == {"type": "phoenix_webhook", "event_at": {"$exists": False}}
+
+    update = backfill_update()[0]["$set"]
+    assert set(update) == {"event_type", "case_id", "evidence_id", "event_at"}
+    assert update["event_at"]["$ifNull"][1] == "$received_at"
+
+
+def test_pipelines_clamp_requested_sizes():
+    assert case_summaries_pipeline(limit=10_000)[-1] == {"$limit": MAX_CASE_SUMMARIES}
+    facets = case_detail_pipeline("case-1", recent=10_000)[-1]["$facet"]
+    assert facets["recent_events"][0] == {"$limit": MAX_RECENT_EVENTS}
+
+
+def test_webhook_stores_case_fields_at_top_level(app):
+    payload = {
+        "event_type": "evidence",
+        "case_id": 7,
+        "data": {"hash": "0xabc"},
+        "timestamp": "2025-01-01T00:00:00Z",
+    }
+    response = TestClient(app).post("/api/webhook/phoenix", json=payload)
+
+    assert response.status_code == 200
+    [doc] = app.state.db.phoenix_webhooks.docs
+    assert doc["type"] == "phoenix_webhook"
+    assert doc["case_id"] == "7"
+    assert doc["event_type"] == "evidence"
+    assert doc["evidence_id"] is None
+    assert doc["event_at"] == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert doc["payload"] == payload
+
+
+def test_webhook_rejects_bad_signature(app):
+    response = TestClient(app).post(
+        "/api/webhook/phoenix",
+        json={"event_type": "evidence"},
+        headers={"X-Signature": "not-the-signature"},
+    )
+
+    assert response.status_code == 401
+    assert app.state.db.phoenix_webhooks.docs == []
+
+
+def test_case_summaries_allow_disk_use(app):
+    response = TestClient(app).get("/api/webhook/phoenix/cases", params={"limit": 10_000})
+
+    assert response.status_code == 200
+    [(pipeline, options)] = app.state.db.phoenix_webhooks.aggregate_calls
+    assert options == {"allowDiskUse": True}
+    assert pipeline[-1] == {"$limit": MAX_CASE_SUMMARIES}
+
+
+def test_case_detail_rejects_unknown_bucket(app):
+    response = TestClient(app).get("/api/webhook/phoenix/cases/case-1", params={"bucket": "minute"})
+
+    assert response.status_code == 422
+    assert app.state.db.phoenix_webhooks.aggregate_calls == []
+
+
+def test_case_detail_returns_404_for_unknown_case(app):
+    app.state.db.phoenix_webhooks.aggregate_results = [
+        {"summary": [], "timeline": [], "recent_events": []}
+    ]
+    response = TestClient(app).get("/api/webhook/phoenix/cases/missing")
+
+    assert response.status_code == 404
+    [(_, options)] = app.state.db.phoenix_webhooks.aggregate_calls
+    assert options == {"allowDiskUse": True}
+
+
+def test_backfill_runs_once_per_database(app):
+    state = app.state
+
+    asyncio.run(server.backfill_phoenix_webhooks(state))
+    asyncio.run(server.backfill_phoenix_webhooks(state))
+
+    assert len(state.db.phoenix_webhooks.update_many_calls) == 1
+    [marker] = state.db.migrations.docs
+    assert marker["_id"] == server.PHOENIX_BACKFILL_MIGRATION_ID
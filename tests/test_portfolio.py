@@ -0,0 +1,168 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+import server
+from services.chains import DEFAULT_CHAINS
+from services.etherscan_v2 import EtherscanError
+from tests.fake_mongo import FakeDatabase
+
+ADDRESS = "0x" + "a" * 40
+USDC = "0x" + "c" * 40
+DAI = "0x" + "d" * 40
+
+
+class FakeUpstream:
+    """Etherscan and CoinGecko stand-ins; each chain holds 2 native units."""
+
+    def __init__(self):
+        self.transfers = {1: [], 80_002: []}
+        self.token_balances = {}
+        self.failing_tokens = set()
+        self.price_error = None
+        self.balance_calls = 0
+        self.priced_ids = []
+
+    async def get_balance(self, address, *, chain_id):
+        self.balance_calls += 1
+        await asyncio.sleep(0)
+        return "2000000000000000000"
+
+    async def get_token_transfers(self, address, *, chain_id):
+        return self.transfers[chain_id]
+
+    async def get_token_balance(self, address, contract, *, chain_id):
+        if contract in self.failing_tokens:
+            raise EtherscanError("NOTOK")
+        return self.token_balances.get(contract, "0")
+
+    async def get_prices(self, coin_ids):
+        if self.price_error is not None:
+            raise self.price_error
+        self.priced_ids.append(sorted(coin_ids))
+        return {"ethereum": 3000.0, "matic-network": 1.0}
+
+    async def get_token_prices(self, platform, addresses):
+        return {address: 1.0 for address in addresses}
+
+
+def _transfer(contract, symbol="TKN", decimals="6"):
+    return {"contractAddress": contract, "tokenSymbol": symbol, "tokenName": symbol, "tokenDecimal": decimals}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(server, "CHAIN_REGISTRY", {chain.chain_id: chain for chain in DEFAULT_CHAINS})
+    monkeypatch.setattr(server, "get_v2_balance", fake.get_balance)
+    monkeypatch.setattr(server, "get_v2_token_transfers", fake.get_token_transfers)
+    monkeypatch.setattr(server, "get_v2_token_balance", fake.get_token_balance)
+    monkeypatch.setattr(server, "get_prices_usd", fake.get_prices)
+    monkeypatch.setattr(server, "get_token_prices_usd", fake.get_token_prices)
+    return fake
+
+
+@pytest.fixture
+def state():
+    state = server.create_app().state
+    state.db = FakeDatabase()
+    return state
+
+
+def _chain(snapshot, chain_id):
+    return next(chain for chain in snapshot["chains"] if chain["chain_id"] == chain_id)
+
+
+def test_complete_snapshot_is_priced_and_persisted(fake, state):
+    fake.transfers[1] = [_transfer(USDC)]
+    fake.token_balances[USDC] = "5000000"
+
+    snapshot = asyncio.run(server.build_portfolio(state, ADDRESS))
+
+    mainnet = _chain(snapshot, 1)
+    assert mainnet["status"] == "success"
+    assert mainnet["native_value_usd"] == 6000.0
+    assert mainnet["tokens"][0]["value_usd"] == 5.0
+    assert snapshot["total_usd"] == 6005.0
+    cache_entry = state.cache_store[server.get_cache_key(f"portfolio:{ADDRESS}")]
+    assert "ttl" not in cache_entry
+    assert [doc["type"] for doc in state.db.eth_cache.docs] == ["portfolio"]
+
+
+def test_testnet_assets_are_unpriced_and_left_out_of_total(fake, state):
+    snapshot = asyncio.run(server.build_portfolio(state, ADDRESS))
+
+    amoy = _chain(snapshot, 80_002)
+    assert amoy["is_testnet"] is True
+    assert amoy["native_balance"] == 2.0
+    assert amoy.get("native_price_usd") is None
+    assert amoy["total_usd"] == 0.0
+    assert snapshot["total_usd"] == 6000.0
+    assert fake.priced_ids == [["ethereum"]]
+
+
+def test_token_balance_failure_marks_chain_partial_and_snapshot_degraded(fake, state):
+    fake.transfers[1] = [_transfer(USDC), _transfer(DAI)]
+    fake.token_balances[USDC] = "5000000"
+    fake.failing_tokens.add(DAI)
+
+    snapshot = asyncio.run(server.build_portfolio(state, ADDRESS))
+
+    mainnet = _chain(snapshot, 1)
+    assert mainnet["status"] == "partial"
+    assert mainnet["error"] == "1 token balance lookups failed"
+    assert [token["contract_address"] for token in mainnet["tokens"]] == [USDC]
+    cache_entry = state.cache_store[server.get_cache_key(f"portfolio:{ADDRESS}")]
+    assert cache_entry["ttl"] == server.PORTFOLIO_DEGRADED_TTL
+    assert state.db.eth_cache.docs == []
+
+
+def test_price_failure_marks_snapshot_degraded(fake, state):
+    fake.price_error = httpx.ConnectError("CoinGecko down")
+
+    snapshot = asyncio.run(server.build_portfolio(state, ADDRESS))
+
+    assert _chain(snapshot, 1)["native_price_usd"] is None
+    assert snapshot["total_usd"] == 0.0
+    cache_entry = state.cache_store[server.get_cache_key(f"portfolio:{ADDRESS}")]
+    assert cache_entry["ttl"] == server.PORTFOLIO_DEGRADED_TTL
+    assert state.db.eth_cache.docs == []
+
+
+def test_token_list_beyond_cap_is_flagged_as_truncated(fake, state, monkeypatch):
+    monkeypatch.setattr(server, "PORTFOLIO_MAX_TOKENS", 2)
+    contracts = [f"0x{index:040x}" for index in range(1, 4)]
+    fake.transfers[1] = [_transfer(contract) for contract in contracts]
+    for contract in contracts:
+        fake.token_balances[contract] = "1000000"
+
+    snapshot = asyncio.run(server.build_portfolio(state, ADDRESS))
+
+    mainnet = _chain(snapshot, 1)
+    assert mainnet["tokens_truncated"] is True
+    assert mainnet["status"] == "partial"
+    assert [token["contract_address"] for token in mainnet["tokens"]] == contracts[:2]
+    assert state.db.eth_cache.docs == []
+
+
+def test_concurrent_requests_share_one_build(fake, state):
+    async def scenario():
+        return await asyncio.gather(*(server.build_portfolio(state, ADDRESS) for _ in range(5)))
+
+    snapshots = asyncio.run(scenario())
+
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert fake.balance_calls == len(server.CHAIN_REGISTRY)
+    assert state.portfolio_builds == {}
+
+
+def test_testnet_transactions_are_not_valued(state):
+    transactions = [{"timestamp": datetime(2025, 1, 1, tzinfo=timezone.utc), "value_eth": 1.0}]
+
+    assert server.POLYGON_AMOY_CHAIN_ID not in server.PRICE_HISTORY_ASSETS
+    valued = asyncio.run(
+        server.attach_usd_at_time(state, transactions, chain_id=server.POLYGON_AMOY_CHAIN_ID)
+    )
+    assert valued[0]["usd_at_time"] is None
@@ -0,0 +1,109 @@
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from services.price_history import PriceHistoryStore, PriceSeries
+
+
+def _series():
+    return PriceSeries.empty().merge(
+        np.array([100, 200, 300]), np.array([1.0, 2.0, 3.0]), 100, 300
+    )
+
+
+def test_merge_sorts_and_prefers_newest_duplicate():
+    series = _series().merge(np.array([300, 400]), np.array([9.0, 4.0]), 300, 400)
+
+    assert series.timestamps.tolist() == [100, 200, 300, 400]
+    assert series.prices.tolist() == [1.0, 2.0, 9.0, 4.0]
+    assert (series.covered_from, series.covered_to) == (100, 400)
+
+
+def test_lookup_interpolates_and_masks_outside_coverage():
+    values = _series().lookup(np.array([50, 150, 300, 350, 2000]), max_gap=100)
+
+    assert math.isnan(values[0])
+    assert values[1:4].tolist() == [1.5, 3.0, 3.0]
+    assert math.isnan(values[4])
+
+
+def test_missing_ranges_respects_max_gap():
+    series = _series()
+
+    assert PriceSeries.empty().missing_ranges(0, 10, max_gap=5) == [(0, 10)]
+    assert series.missing_ranges(150, 350, max_gap=100) == []
+    assert series.missing_ranges(50, 500, max_gap=100) == [(50, 100), (300, 500)]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "ethereum.npz"
+    _series().save(path)
+    loaded = PriceSeries.load(path)
+
+    assert loaded.timestamps.tolist() == [100, 200, 300]
+    assert loaded.prices.dtype == np.float32
+    assert (loaded.covered_from, loaded.covered_to) == (100, 300)
+    assert [p.name for p in tmp_path.iterdir()] == ["ethereum.npz"]
+
+
+def test_usd_values_downloads_once_then_serves_locally(tmp_path):
+    now = int(time.time())
+    calls = []
+    store = PriceHistoryStore(tmp_path)
+
+    async def download(coin_id, start, end):
+        calls.append((start, end))
+        return np.array([now - 7200, now - 3600]), np.array([1000.0, 2000.0])
+
+    store._download = download
+    timestamps = [datetime.fromtimestamp(now - 5400, tz=timezone.utc)]
+
+    first = asyncio.run(store.usd_values("ethereum", timestamps, [2.0]))
+    second = asyncio.run(store.usd_values("ethereum", timestamps, [1.0]))
+
+    assert first == [3000.0]
+    assert second == [1500.0]
+    assert len(calls) == 1
+    assert not store.needs_download("ethereum", now - 5400, now - 5400)
+
+
+def test_failed_ranges_are_not_retried_until_ttl(tmp_path, clock):
+    calls = []
+    store = PriceHistoryStore(tmp_path, failed_range_ttl=60, clock=clock)
+
+    async def download(coin_id, start, end):
+        calls.append((start, end))
+        raise httpx.HTTPStatusError("401", request=None, response=None)
+
+    store._download = download
+    timestamps = [datetime(2020, 1, 1, tzinfo=timezone.utc)]
+
+    assert asyncio.run(store.usd_values("ethereum", timestamps, [1.0])) == [None]
+    assert asyncio.run(store.usd_values("ethereum", timestamps, [1.0])) == [None]
+    assert len(calls) == 1
+
+    clock.now = 61
+    asyncio.run(store.usd_values("ethereum", timestamps, [1.0]))
+    assert len(calls) == 2
+
+
+def test_needs_download_does_not_read_unloaded_series(tmp_path, monkeypatch):
+    now = int(time.time())
+    PriceSeries.empty().merge(
+        np.array([now - 7200, now - 3600]), np.array([1000.0, 2000.0]), now - 7200, now
+    ).save(tmp_path / "ethereum.npz")
+    store = PriceHistoryStore(tmp_path)
+
+    def fail_load(path):
+        raise AssertionError("series read during needs_download")
+
+    monkeypatch.setattr(PriceSeries, "load", fail_load)
+    assert store.needs_download("ethereum", now - 5400, now - 5400)
+
+    monkeypatch.undo()
+    asyncio.run(store.load("ethereum"))
+    assert not store.needs_download("ethereum", now - 5400, now - 5400)
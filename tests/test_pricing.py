@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services import pricing
+
+
+def _respond(monkeypatch, **response_kwargs):
+    async def fake_get(url, *, params=None, timeout):
+        request = httpx.Request("GET", url, params=params)
+        return httpx.Response(200, request=request, **response_kwargs)
+
+    monkeypatch.setattr(pricing.upstream, "get", fake_get)
+
+
+def test_token_prices_keyed_by_lowercase_address(monkeypatch):
+    _respond(monkeypatch, json={"0xABC": {"usd": 1.5}, "0xdef": {}})
+
+    prices = asyncio.run(pricing.get_token_prices_usd("ethereum", ["0xABC", "0xdef"]))
+
+    assert prices == {"0xabc": 1.5}
+
+
+@pytest.mark.parametrize("response_kwargs", [
+    {"content": b"<html>rate limited</html>"},
+    {"json": [{"error": "bad request"}]},
+])
+def test_unusable_price_payloads_raise_pricing_error(monkeypatch, response_kwargs):
+    _respond(monkeypatch, **response_kwargs)
+
+    with pytest.raises(pricing.PricingError):
+        asyncio.run(pricing.get_prices_usd(["ethereum"]))
+
+
+def test_empty_lookup_makes_no_request(monkeypatch):
+    async def fail(*args, **kwargs):
+        raise AssertionError("unexpected request")
+
+    monkeypatch.setattr(pricing.upstream, "get", fail)
+
+    assert asyncio.run(pricing.get_token_prices_usd("ethereum", [])) == {}
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from services import upstream
+from services.cache_warmer import AccessTracker
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def unreachable_mongo(monkeypatch):
+    monkeypatch.setenv("MONGO_URL", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=200")
+    monkeypatch.setenv("DB_NAME", "test")
+
+
+def test_apps_do_not_share_state():
+    first, second = server.create_app(), server.create_app()
+
+    for name in ("cache_store", "admission", "price_history", "access_tracker", "cache_warmer"):
+        assert getattr(first.state, name) is not getattr(second.state, name)
+    assert first.state.cache_warmer.tracker is first.state.access_tracker
+
+
+def test_startup_does_not_wait_for_mongo(unreachable_mongo):
+    with TestClient(server.create_app()) as client:
+        response = client.get("/api/ready")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "starting"}
+
+
+def test_shutting_down_one_app_keeps_the_other_pool_open(unreachable_mongo):
+    with TestClient(server.create_app()):
+        with TestClient(server.create_app()):
+            pass
+        assert upstream._client is not None
+    assert upstream._client is None
+
+
+def test_hydrate_cache_loads_fresh_entries_and_seeds_ranking(clock):
+    now = datetime.now(timezone.utc)
+    docs = [
+        {
+            "type": f"balance:{server.ETH_CHAIN_ID}",
+            "address": "0xfresh",
+            "balance_wei": "1000000000000000000",
+            "balance_native": 1.0,
+            "cached_at": now,
+            "updated_at": now,
+        },
+        {
+            "type": f"transactions:{server.ETH_CHAIN_ID}",
+            "address": "0xstale",
+            "transactions": [],
+            "cached_at": now - timedelta(hours=1),
+            "updated_at": now - timedelta(hours=1),
+        },
+        {
+            "type": "portfolio",
+            "address": "0xignored",
+            "cached_at": now,
+            "updated_at": now,
+        },
+    ]
+    state = server.create_app().state
+    state.db = FakeDatabase(eth_cache=docs)
+    state.access_tracker = AccessTracker(half_life=300, clock=clock)
+    state.cache_warmer = server.build_cache_warmer(state)
+    warmer = state.cache_warmer
+
+    hydrated = asyncio.run(server.hydrate_cache(state))
+
+    assert hydrated == 1
+    key = server.get_cache_key(f"balance:{server.ETH_CHAIN_ID}:0xfresh")
+    assert state.cache_store[key]["data"]["symbol"] == "ETH"
+
+    # Still above the warmer threshold at its first pass and until one half-life has passed.
+    seeded = {
+        ("balance", server.ETH_CHAIN_ID, "0xfresh"),
+        ("txs", server.ETH_CHAIN_ID, "0xstale"),
+    }
+    for elapsed in (warmer.interval, 299):
+        clock.now = elapsed
+        ranked = state.access_tracker.top_k(warmer.top_k, min_score=warmer.min_score)
+        assert {k for k, _ in ranked[server.ETH_CHAIN_ID]} == seeded
+
+    clock.now = 301
+    assert state.access_tracker.top_k(warmer.top_k, min_score=warmer.min_score) == {}
@@ -0,0 +1,33 @@
+import asyncio
+
+from services.upstream import RateLimiter
+
+
+def test_rate_limiter_allows_burst_then_waits(monkeypatch, clock):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(2, clock=clock)
+
+    async def scenario():
+        for _ in range(4):
+            await limiter.acquire()
+
+    asyncio.run(scenario())
+
+    assert sleeps == [0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_rate_limiter_disabled_for_non_positive_rate():
+    limiter = RateLimiter(0)
+
+    async def scenario():
+        for _ in range(100):
+            await limiter.acquire()
+
+    asyncio.run(scenario())